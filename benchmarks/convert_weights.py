@@ -0,0 +1,58 @@
+"""
+Compares the speed of the vectorized sybil.base.utils.weight_utils.convert_weights_and_uids_for_emit with the former
+per-value implementation. Their equivalence is checked by tests/test_convert_weights.py.
+
+    python benchmarks/convert_weights.py --sizes 256 4096 65536
+"""
+import sys
+import argparse
+import time
+import numpy as np
+
+from pathlib import Path
+
+
+def parse_args() -> argparse.Namespace:
+    """Parses the options of the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark convert_weights_and_uids_for_emit")
+    parser.add_argument("--sizes", help="Numbers of uids to benchmark", type=int, nargs="+", default=[256, 1024, 4096, 16384, 65536])
+    parser.add_argument("--repeat", help="Runs at 256 uids, scaled down for larger sizes", type=int, default=200)
+    parser.add_argument("--seed", help="Random seed", type=int, default=0)
+    return parser.parse_args()
+
+
+# bittensor parses the command line when it is imported, and answers --help with its own options, so the options
+# of this script are parsed before importing it.
+if __name__ == "__main__":
+    ARGS = parse_args()
+
+# Runnable from anywhere without installing the package.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sybil.base.utils.weight_utils import convert_weights_and_uids_for_emit
+from tests.test_convert_weights import legacy_convert
+
+
+def bench(fn, repeat: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main(args):
+    rng = np.random.default_rng(args.seed)
+
+    print(f"{'uids':>6} {'legacy ms':>10} {'vector ms':>10} {'speedup':>8} {'vector ns/uid':>14}")
+    for size in args.sizes:
+        uids = np.arange(size)
+        weights = rng.random(size).astype(np.float32)
+        repeat = max(1, args.repeat * 256 // size)
+        old = bench(lambda: legacy_convert(uids, weights), repeat)
+        new = bench(lambda: convert_weights_and_uids_for_emit(uids, weights), repeat)
+        print(f"{size:>6} {old * 1e3:>10.3f} {new * 1e3:>10.3f} {old / new:>7.1f}x {new / size * 1e9:>14.1f}")
+
+
+if __name__ == "__main__":
+    main(ARGS)
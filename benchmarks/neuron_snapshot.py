@@ -0,0 +1,117 @@
+"""
+Compares building and encoding the neuron broadcast payload the old way, one neuron at a time, against the column
+based builder in sybil.utils.broadcast.
+
+    python benchmarks/neuron_snapshot.py --sizes 256 1024 4096
+"""
+import sys
+import argparse
+import json
+import time
+import random
+import numpy as np
+
+from pathlib import Path
+from types import SimpleNamespace
+
+
+def parse_args() -> argparse.Namespace:
+    """Parses the options of the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark the neuron broadcast payload")
+    parser.add_argument("--sizes", help="Metagraph sizes to benchmark", type=int, nargs="+", default=[256, 1024, 4096])
+    parser.add_argument("--repeat", help="Runs per size", type=int, default=50)
+    return parser.parse_args()
+
+
+# bittensor parses the command line when it is imported, and answers --help with its own options, so the options
+# of this script are parsed before importing it.
+if __name__ == "__main__":
+    ARGS = parse_args()
+
+# Runnable from anywhere without installing the package.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sybil.base.consts import BURN_UID
+from sybil.utils.broadcast import dumps, neuron_snapshot
+
+
+def fake_metagraph(n: int):
+    rng = np.random.default_rng(n)
+    uids = np.arange(n, dtype=np.int64)
+    hotkeys = [f"5H{random.getrandbits(200):050x}"[:48] for _ in range(n)]
+    coldkeys = [f"5C{random.getrandbits(200):050x}"[:48] for _ in range(n)]
+    axons = [SimpleNamespace(ip=f"10.0.{uid // 256}.{uid % 256}") for uid in range(n)]
+    metagraph = SimpleNamespace(
+        block=np.int64(5_000_000),
+        uids=uids,
+        axons=axons,
+        validator_trust=rng.random(n, dtype=np.float32),
+        trust=rng.random(n, dtype=np.float32),
+        alpha_stake=rng.random(n, dtype=np.float32) * 1e4,
+        S=rng.random(n, dtype=np.float32) * 1e4,
+        hotkeys=hotkeys,
+        coldkeys=coldkeys,
+    )
+    metagraph.neurons = [
+        SimpleNamespace(
+            uid=uid,
+            validator_trust=float(metagraph.validator_trust[uid]),
+            trust=float(metagraph.trust[uid]),
+            hotkey=hotkeys[uid],
+            coldkey=coldkeys[uid],
+        )
+        for uid in range(n)
+    ]
+    return metagraph
+
+
+def legacy_payload(metagraph) -> bytes:
+    """The per-neuron loop the validator used before, encoded the way aiohttp's `json=` does."""
+    neurons_info = []
+    block = int(metagraph.block)
+    for neuron in metagraph.neurons:
+        uid = neuron.uid
+        neurons_info.append({
+            'uid': uid,
+            'ip': metagraph.axons[uid].ip,
+            'validator_trust': neuron.validator_trust,
+            'trust': neuron.trust,
+            "alpha_stake": float(metagraph.alpha_stake[uid].item()),
+            'stake_weight': float(metagraph.S[uid].item()),
+            'block': block,
+            'hotkey': neuron.hotkey,
+            'coldkey': neuron.coldkey,
+            'excluded': uid == BURN_UID,
+        })
+    return json.dumps({"neurons": neurons_info}).encode()
+
+
+def columnar_payload(metagraph) -> bytes:
+    return dumps({"neurons": neuron_snapshot(metagraph)})
+
+
+def bench(fn, metagraph, repeat: int) -> float:
+    fn(metagraph)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(metagraph)
+    return (time.perf_counter() - start) / repeat
+
+
+def main(args):
+    print(f"{'uids':>6} {'legacy ms':>10} {'columnar ms':>12} {'speedup':>8} {'bytes':>9}")
+    for n in args.sizes:
+        metagraph = fake_metagraph(n)
+        legacy = json.loads(legacy_payload(metagraph))["neurons"]
+        columnar = json.loads(columnar_payload(metagraph))["neurons"]
+        assert [sorted(e) for e in legacy] == [sorted(e) for e in columnar], "payload keys differ"
+        assert all(a["uid"] == b["uid"] and a["hotkey"] == b["hotkey"] for a, b in zip(legacy, columnar))
+
+        old = bench(legacy_payload, metagraph, args.repeat)
+        new = bench(columnar_payload, metagraph, args.repeat)
+        size = len(columnar_payload(metagraph))
+        print(f"{n:>6} {old * 1e3:>10.2f} {new * 1e3:>12.2f} {old / new:>7.1f}x {size:>9}")
+
+
+if __name__ == "__main__":
+    main(ARGS)
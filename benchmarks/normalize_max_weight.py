@@ -0,0 +1,62 @@
+"""
+Compares the speed of the vectorized sybil.base.utils.weight_utils.normalize_max_weight with the former per-value
+implementation, one vector at a time and as a 2-D batch. Their equivalence is checked by
+tests/test_normalize_max_weight.py.
+
+    python benchmarks/normalize_max_weight.py --sizes 256 4096 65536
+"""
+import sys
+import argparse
+import time
+import numpy as np
+
+from pathlib import Path
+
+
+def parse_args() -> argparse.Namespace:
+    """Parses the options of the benchmark."""
+    parser = argparse.ArgumentParser(description="Check and benchmark normalize_max_weight")
+    parser.add_argument("--sizes", help="Vector sizes to benchmark", type=int, nargs="+", default=[256, 1024, 4096, 16384, 65536])
+    parser.add_argument("--limit", help="Max weight limit", type=float, default=0.05)
+    parser.add_argument("--batch", help="Rows of the batch benchmark", type=int, default=16)
+    parser.add_argument("--repeat", help="Runs at 256 entries, scaled down for larger sizes", type=int, default=200)
+    parser.add_argument("--seed", help="Random seed", type=int, default=0)
+    return parser.parse_args()
+
+
+# bittensor parses the command line when it is imported, and answers --help with its own options, so the options
+# of this script are parsed before importing it.
+if __name__ == "__main__":
+    ARGS = parse_args()
+
+# Runnable from anywhere without installing the package.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sybil.base.utils.weight_utils import normalize_max_weight
+from tests.test_normalize_max_weight import legacy_normalize_max_weight
+
+def bench(fn, repeat: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main(args):
+    rng = np.random.default_rng(args.seed)
+
+    print(f"{'entries':>8} {'legacy ms':>10} {'vector ms':>10} {'speedup':>8} {'batch/row ms':>13}")
+    for size in args.sizes:
+        x = rng.pareto(1.0, size).astype(np.float32)
+        limit = max(args.limit, 2 / size)
+        repeat = max(1, args.repeat * 256 // size)
+        batch = np.stack([rng.permutation(x) for _ in range(args.batch)])
+        old = bench(lambda: legacy_normalize_max_weight(x, limit), repeat)
+        new = bench(lambda: normalize_max_weight(x, limit), repeat)
+        per_row = bench(lambda: normalize_max_weight(batch, limit), repeat) / args.batch
+        print(f"{size:>8} {old * 1e3:>10.3f} {new * 1e3:>10.3f} {old / new:>7.1f}x {per_row * 1e3:>13.3f}")
+
+
+if __name__ == "__main__":
+    main(ARGS)
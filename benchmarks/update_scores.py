@@ -0,0 +1,123 @@
+"""
+Compares the moving average update the validator used to allocate on every call against the in place
+sybil.validator.ema.ScoreUpdater, in time and in memory allocated per update.
+
+    python benchmarks/update_scores.py --sizes 256 1024 4096
+"""
+import sys
+import argparse
+import time
+import tracemalloc
+import numpy as np
+
+from pathlib import Path
+
+
+def parse_args() -> argparse.Namespace:
+    """Parses the options of the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark the moving average score update")
+    parser.add_argument("--sizes", help="Numbers of uids to benchmark", type=int, nargs="+", default=[256, 1024, 4096])
+    parser.add_argument("--batch", help="Rewarded uids per update", type=int, default=64)
+    parser.add_argument("--repeat", help="Updates per size", type=int, default=2000)
+    return parser.parse_args()
+
+
+# bittensor parses the command line when it is imported, and answers --help with its own options, so the options
+# of this script are parsed before importing it.
+if __name__ == "__main__":
+    ARGS = parse_args()
+
+# Runnable from anywhere without installing the package.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sybil.validator.ema import ScoreUpdater
+
+ALPHA = 0.1
+
+
+def legacy_update(scores: np.ndarray, rewards: np.ndarray, uids: np.ndarray, partial: bool = False) -> np.ndarray:
+    """The update as BaseValidatorNeuron.update_scores did it before, minus the logging."""
+    rewards = np.nan_to_num(rewards, nan=0) if np.isnan(rewards).any() else np.asarray(rewards)
+    uids_array = uids.copy()
+    scattered_rewards = np.zeros_like(scores)
+    scattered_rewards[uids_array] = rewards
+    if partial:
+        scores[uids_array] = ALPHA * rewards + (1 - ALPHA) * scores[uids_array]
+        return scores
+    return ALPHA * scattered_rewards + (1 - ALPHA) * scores
+
+
+def check_equivalence(n: int, rng: np.random.Generator):
+    updater = ScoreUpdater(ALPHA)
+    for partial in (False, True):
+        expected = rng.random(n)
+        actual = expected.copy()
+        rounds = [
+            (rng.random(n // 4).astype(np.float32), rng.choice(n, n // 4, replace=False))
+            for _ in range(5)
+        ]
+        for rewards, uids in rounds:
+            expected = legacy_update(expected, rewards, uids, partial)
+            updater.update(actual, rewards, uids, partial)
+        assert np.allclose(expected, actual), f"single updates differ at n={n}, partial={partial}"
+
+        # Stacked rounds over the same uids fold into one update.
+        uids = rng.choice(n, n // 4, replace=False)
+        stacked = rng.random((3, n // 4))
+        for rewards in stacked:
+            expected = legacy_update(expected, rewards, uids, partial)
+        updater.update(actual, stacked, uids, partial)
+        assert np.allclose(expected, actual), f"stacked updates differ at n={n}, partial={partial}"
+
+        # A NaN only drops the reward of its own round, stacked or not.
+        stacked[1, 0] = np.nan
+        for rewards in stacked:
+            expected = legacy_update(expected, rewards, uids, partial)
+        updater.update(actual, stacked, uids, partial)
+        assert np.allclose(expected, actual), f"stacked updates with NaN differ at n={n}, partial={partial}"
+
+
+def measure(fn, repeat: int, runs: int = 5):
+    fn()
+    # Best of several runs, single runs of a few microseconds are dominated by noise.
+    elapsed = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        for _ in range(repeat // runs):
+            fn()
+        elapsed = min(elapsed, (time.perf_counter() - start) / (repeat // runs))
+
+    # Traced separately, tracing slows down every allocation.
+    tracemalloc.start()
+    for _ in range(repeat):
+        fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main(args):
+    rng = np.random.default_rng(0)
+    print(f"{'uids':>6} {'legacy us':>10} {'in place us':>12} {'legacy peak B':>14} {'in place peak B':>16}")
+    for n in args.sizes:
+        check_equivalence(n, rng)
+        uids = rng.choice(n, args.batch, replace=False)
+        rewards = rng.random(args.batch).astype(np.float32)
+        state = {"scores": rng.random(n)}
+
+        def legacy():
+            state["scores"] = legacy_update(state["scores"], rewards, uids)
+
+        scores = rng.random(n)
+        updater = ScoreUpdater(ALPHA)
+
+        def in_place():
+            updater.update(scores, rewards, uids)
+
+        old, old_peak = measure(legacy, args.repeat)
+        new, new_peak = measure(in_place, args.repeat)
+        print(f"{n:>6} {old * 1e6:>10.1f} {new * 1e6:>12.1f} {old_peak:>14} {new_peak:>16}")
+
+
+if __name__ == "__main__":
+    main(ARGS)
@@ -0,0 +1,265 @@
+"""
+Runs the validator's weight pipeline offline, against sybil.mock.MockSubtensor and a synthetic metagraph, and reports
+the wall time, peak memory and allocations of every stage at several subnet sizes.
+
+Every round folds fresh rewards into the scores, then goes through the stages of set_weights: L1 normalization,
+process_weights_for_netuid, convert_weights_and_uids_for_emit, and the hand over to the WeightSubmitter, whose gate
+skips vectors that barely moved. The submitter sends its extrinsics to a chain that accepts and includes them without
+doing anything, and the pipeline waits for it outside of the measured stages.
+
+Rounds in which the hyperparameter cache expires read the mock chain, their process_weights is reported on a line of
+its own.
+
+    python benchmarks/weight_pipeline.py --sizes 256 4096 65536 --rounds 20
+"""
+import sys
+import argparse
+import time
+import tracemalloc
+import numpy as np
+
+from pathlib import Path
+from types import SimpleNamespace
+
+
+def parse_args() -> argparse.Namespace:
+    """Parses the options of the simulator."""
+    parser = argparse.ArgumentParser(description="Simulate and benchmark the weight pipeline offline")
+    parser.add_argument("--sizes", help="Subnet sizes to simulate", type=int, nargs="+", default=[256, 1024, 4096, 16384, 65536])
+    parser.add_argument("--rounds", help="Timed rounds per size", type=int, default=20)
+    parser.add_argument("--trace-rounds", help="Rounds per size traced for memory", type=int, default=3)
+    parser.add_argument("--netuid", help="Netuid of the mock subnet", type=int, default=1)
+    parser.add_argument("--min-allowed-weights", help="MinAllowedWeights of the mock subnet", type=int, default=1)
+    parser.add_argument("--max-weight-limit", help="MaxWeightLimit of the mock subnet, as a fraction", type=float, default=0.1)
+    parser.add_argument("--tempo", help="Tempo of the mock subnet", type=int, default=360)
+    parser.add_argument("--blocks-per-round", help="Blocks the chain advances between two rounds", type=int, default=100)
+    parser.add_argument("--alpha", help="Moving average alpha of the scores", type=float, default=0.1)
+    parser.add_argument("--sparsity", help="Share of uids rewarded nothing in a round", type=float, default=0.5)
+    parser.add_argument("--l1-threshold", help="L1 change up to which weights are not resubmitted", type=float, default=0.0)
+    parser.add_argument("--linf-threshold", help="Single weight change up to which weights are not resubmitted", type=float, default=0.0)
+    parser.add_argument("--refresh-blocks", help="Blocks after which unchanged weights are resubmitted", type=int, default=2000)
+    parser.add_argument("--seed", help="Random seed", type=int, default=0)
+    return parser.parse_args()
+
+
+# bittensor parses the command line when it is imported, and answers --help with its own options, so the options
+# of this script are parsed before importing it.
+if __name__ == "__main__":
+    ARGS = parse_args()
+
+# Runnable from anywhere without installing the package.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sybil.mock import MockSubtensor
+from sybil.base.consts import BURN_UID, BURN_WEIGHT
+from sybil.base.utils.hyperparams import HYPERPARAMETERS
+from sybil.base.utils.weight_utils import (
+    U16_MAX,
+    l1_normalize,
+    process_weights_for_netuid,
+    convert_weights_and_uids_for_emit,
+)
+from sybil.validator.ema import ScoreUpdater
+from sybil.validator.weights import WeightSubmitter
+
+STAGES = ["l1_normalize", "process_weights", "convert_for_emit", "submit"]
+# Where process_weights is reported in rounds that read the hyperparameters from the mock chain.
+MISS = "process_weights (cache miss)"
+
+
+def mock_subnet(netuid: int, n: int, args) -> MockSubtensor:
+    """
+    Returns a MockSubtensor whose subnet has `n` neurons and the hyperparameters from `args`.
+
+    The subnet state is written to the mock chain directly, registering neurons one by one takes quadratic time.
+    """
+    subtensor = MockSubtensor(netuid, n=0)
+    state = subtensor.chain_state["SubtensorModule"]
+    block = subtensor.get_current_block()
+    state["SubnetworkN"][netuid][block] = n
+    state["MinAllowedWeights"][netuid][block] = args.min_allowed_weights
+    state["MaxWeightLimit"][netuid][block] = round(args.max_weight_limit * U16_MAX)
+    state["Tempo"][netuid][block] = args.tempo
+    return subtensor
+
+
+def mock_metagraph(n: int, block: int) -> SimpleNamespace:
+    """Returns the metagraph fields the weight pipeline reads."""
+    return SimpleNamespace(n=n, uids=np.arange(n), block=np.int64(block))
+
+
+class NoopChain:
+    """
+    Chain the weight submitter sends to: every extrinsic is accepted and included at once, at the metagraph's block.
+    """
+
+    def __init__(self, metagraph: SimpleNamespace):
+        self.metagraph = metagraph
+        self.last_update = 0
+
+    def set_weights(self, **kwargs):
+        self.last_update = self.get_current_block()
+        return True, ""
+
+    def get_current_block(self) -> int:
+        return int(self.metagraph.block)
+
+    def blocks_since_last_update(self, netuid: int, uid: int) -> int:
+        return self.get_current_block() - self.last_update
+
+
+def rewards(rng: np.random.Generator, n: int, sparsity: float) -> np.ndarray:
+    """Skewed rewards, most of the subnet scoring little and a `sparsity` share of it nothing at all."""
+    values = rng.pareto(1.5, n) * (rng.random(n) >= sparsity)
+    return (values / max(values.max(), 1e-12)).astype(np.float32)
+
+
+class Pipeline:
+    """
+    State of one simulated validator: its scores, the mock chain and the weight submitter.
+    """
+
+    def __init__(self, n: int, args):
+        self.n = n
+        self.args = args
+        self.rng = np.random.default_rng(args.seed)
+        self.subtensor = mock_subnet(args.netuid, n, args)
+        self.metagraph = mock_metagraph(n, self.subtensor.get_current_block())
+        self.scores = np.zeros(n, dtype=np.float32)
+        self.score_updater = ScoreUpdater(args.alpha)
+        chain = NoopChain(self.metagraph)
+        self.submitter = WeightSubmitter(
+            lambda: chain,
+            None,
+            args.netuid,
+            0,
+            0,
+            inclusion_poll=0.001,
+            l1_threshold=args.l1_threshold,
+            linf_threshold=args.linf_threshold,
+            refresh_blocks=args.refresh_blocks,
+        )
+
+    def next_round(self):
+        """Folds a round of rewards into the scores and advances the chain."""
+        self.score_updater.update(self.scores, rewards(self.rng, self.n, self.args.sparsity), self.metagraph.uids)
+        self.metagraph.block += self.args.blocks_per_round
+
+    def stages(self):
+        """Runs the stages in order, yielding the name of each after it ran."""
+        raw_weights = l1_normalize(self.scores)
+        yield "l1_normalize"
+
+        misses = HYPERPARAMETERS.misses
+        uids, weights = process_weights_for_netuid(
+            uids=self.metagraph.uids,
+            weights=raw_weights,
+            netuid=self.args.netuid,
+            subtensor=self.subtensor,
+            metagraph=self.metagraph,
+            burn_uid=BURN_UID,
+            burn_weight=BURN_WEIGHT,
+        )
+        yield "process_weights" if HYPERPARAMETERS.misses == misses else MISS
+
+        uint_uids, uint_weights = convert_weights_and_uids_for_emit(uids=uids, weights=weights)
+        yield "convert_for_emit"
+
+        outcomes = dict(self.submitter.outcomes)
+        submitted = self.submitter.submit(uint_uids, uint_weights, int(self.metagraph.block))
+        yield "submit"
+
+        # Not measured: let the worker set and include the vector, so the next round is gated against it.
+        if submitted:
+            self.wait(lambda: self.submitter.outcomes["included"] > outcomes["included"])
+
+    def wait(self, condition, timeout: float = 10.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Weight submitter stuck: {self.submitter.stats()}")
+            time.sleep(0.0005)
+
+
+def time_stages(pipeline: Pipeline, rounds: int) -> dict:
+    """Wall time of every stage, and the number of rounds it ran in, over `rounds` rounds, without tracing."""
+    totals, counts = {}, {}
+    for _ in range(rounds):
+        pipeline.next_round()
+        start = time.perf_counter()
+        for stage in pipeline.stages():
+            now = time.perf_counter()
+            totals[stage] = totals.get(stage, 0.0) + now - start
+            counts[stage] = counts.get(stage, 0) + 1
+            start = now
+    return {stage: (totals[stage] / counts[stage], counts[stage]) for stage in totals}
+
+
+def trace_stages(pipeline: Pipeline, rounds: int) -> dict:
+    """
+    Largest peak of traced memory and of net allocated blocks of every stage over `rounds` rounds.
+
+    Python has no hook counting allocations as they happen, the block count is the number of traced blocks a stage
+    left allocated once it returned, its inputs excluded.
+    """
+    memory = {}
+    tracemalloc.start()
+    try:
+        for _ in range(rounds):
+            pipeline.next_round()
+            before = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            for stage in pipeline.stages():
+                current, peak = tracemalloc.get_traced_memory()
+                after = tracemalloc.take_snapshot()
+                count = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+                peaks, blocks = memory.get(stage, (0, 0))
+                memory[stage] = (max(peaks, peak - base), max(blocks, count))
+                # Snapshots allocate as well, measure the next stage from here.
+                before = tracemalloc.take_snapshot()
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return memory
+
+
+def main(args):
+    print(f"{'uids':>6} {'stage':<28} {'rounds':>6} {'mean ms':>9} {'peak KiB':>9} {'net blocks':>11}")
+    for size in args.sizes:
+        HYPERPARAMETERS.invalidate()
+        pipeline = Pipeline(size, args)
+        try:
+            # Warm up, the first round reads the hyperparameters from the mock chain.
+            pipeline.next_round()
+            for _ in pipeline.stages():
+                pass
+            times = time_stages(pipeline, args.rounds)
+            memory = trace_stages(pipeline, args.trace_rounds)
+        finally:
+            pipeline.submitter.stop()
+
+        for stage in STAGES + [MISS]:
+            if stage not in times:
+                continue
+            mean, rounds = times[stage]
+            # Stages that did not run in a traced round, e.g. a cache miss, have no memory figures.
+            peak, blocks = (f"{memory[stage][0] / 1024:.1f}", memory[stage][1]) if stage in memory else ("-", "-")
+            print(f"{size:>6} {stage:<28} {rounds:>6} {mean * 1e3:>9.3f} {peak:>9} {blocks:>11}")
+        total = sum(times[stage][0] for stage in STAGES if stage in times)
+        outcomes = pipeline.submitter.outcomes
+        print(
+            f"{size:>6} {'total, cache hits':<28} {args.rounds:>6} {total * 1e3:>9.3f}   "
+            f"submitted {outcomes['success']}, skipped {outcomes['skipped']}"
+        )
+
+    stats = HYPERPARAMETERS.stats()
+    print(
+        f"hyperparameter cache: {stats['hits']} hits, {stats['misses']} misses, {stats['rpcs']} chain calls, "
+        f"{stats['rpcs_saved']} saved"
+    )
+
+
+if __name__ == "__main__":
+    main(ARGS)
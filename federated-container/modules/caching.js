@@ -13,6 +13,8 @@ export const tpn_cache_keys = [
 
     'last_known_validators',
     'last_known_miners',
+    'last_known_neurons',
+    'last_known_neurons_version',
 
     'ip_addresses',
     'country_count',
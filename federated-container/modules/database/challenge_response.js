@@ -1,5 +1,5 @@
 import { log } from "mentie"
-import { get_pg_pool } from "./postgres.js"
+import { get_pg_pool, format } from "./postgres.js"
 
 /**
  * Writes a challenge/solution pair to the database.
@@ -30,6 +30,38 @@ export async function write_challenge_solution_pair( { challenge, solution } ) {
 
 }
 
+/**
+ * Writes many challenge/solution pairs to the database in a single query.
+ * @param {Object} params - Parameters for writing challenge/solution pairs
+ * @param {Array<{ challenge: string, solution: string }>} params.pairs - The challenge/solution pairs to write.
+ * @returns {Promise<{ success: boolean, count: number }>} The result of the write operation.
+ */
+export async function write_challenge_solution_pairs( { pairs } ) {
+
+    if( !pairs?.length ) return { success: true, count: 0 }
+
+    const pool = await get_pg_pool()
+
+    const updated = Date.now()
+    const values = pairs.map( ( { challenge, solution } ) => [ challenge, solution, updated ] )
+    const query = format( `
+        INSERT INTO challenge_solution (challenge, solution, updated)
+        VALUES %L
+        ON CONFLICT (challenge) DO UPDATE SET solution = EXCLUDED.solution, updated = EXCLUDED.updated
+    `, values )
+
+    try {
+
+        const result = await pool.query( query )
+        return { success: true, count: result.rowCount }
+
+    } catch ( e ) {
+        log.error( `Failed to write challenge/solution pairs:`, e )
+        throw new Error( `Failed to write challenge/solution pairs: ${ e.message }` )
+    }
+
+}
+
 /**
  * 
  * @param {Object} params - Parameters for retrieving a challenge solution
@@ -1,8 +1,22 @@
 import { v4 as uuidv4 } from 'uuid'
-import { write_challenge_solution_pair } from '../database/challenge_response.js'
+import { write_challenge_solution_pair, write_challenge_solution_pairs } from '../database/challenge_response.js'
 import { log } from 'mentie'
 import { base_url } from '../networking/url.js'
 
+/**
+ * Formulates the public url a challenge is solved at.
+ * @param {Object} params
+ * @param {string} params.challenge - The challenge id.
+ * @param {string} [params.tag] - Optional tag, e.g. the miner uid the challenge is for.
+ * @returns {string} The challenge url.
+ */
+function make_challenge_url( { challenge, tag } ) {
+    const challenge_url = new URL( base_url )
+    challenge_url.pathname = `/protocol/challenge/${ challenge }`
+    if( tag ) challenge_url.searchParams.set( 'tag', tag )
+    return challenge_url.toString()
+}
+
 /**
  * @param {Object} params - Parameters for generating a challenge
  * @param {string} params.miner_uid - The unique identifier for the miner.
@@ -20,10 +34,7 @@ export async function generate_challenge( { tag }={} ) {
     await write_challenge_solution_pair( { challenge, solution, tag } )
 
     // Formulate public challenge URL
-    let challenge_url = new URL( base_url )
-    challenge_url.pathname = `/protocol/challenge/${ challenge }`
-    if( tag ) challenge_url.searchParams.set( 'tag', tag )
-    challenge_url = challenge_url.toString()
+    const challenge_url = make_challenge_url( { challenge, tag } )
     log.info( `New challenge url generated: ${ challenge_url }` )
 
     // Log generation
@@ -31,4 +42,25 @@ export async function generate_challenge( { tag }={} ) {
 
     return { challenge, solution, challenge_url }
 
-}
\ No newline at end of file
+}
+
+/**
+ * Generates one challenge per tag, saving all challenge/solution pairs with a single database write.
+ * @param {Object} params - Parameters for generating challenges
+ * @param {Array<string>} params.tags - One tag per challenge, e.g. the miner uids the challenges are for.
+ * @returns {Promise<Array<{ tag: string, challenge: string, solution: string, challenge_url: string }>>} The generated challenges, in the order of the tags.
+ */
+export async function generate_challenges( { tags=[] }={} ) {
+
+    const challenges = tags.map( tag => {
+        const challenge = uuidv4()
+        const solution = uuidv4()
+        return { tag, challenge, solution, challenge_url: make_challenge_url( { challenge, tag } ) }
+    } )
+
+    await write_challenge_solution_pairs( { pairs: challenges } )
+    log.info( `Generated ${ challenges.length } challenge/response pairs` )
+
+    return challenges
+
+}
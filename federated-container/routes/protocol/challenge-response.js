@@ -3,7 +3,7 @@ import { cache, log, make_retryable } from "mentie"
 import { cooldown_in_s, retry_times } from "../../modules/networking/routing.js"
 import { request_is_local } from "../../modules/networking/network.js"
 import { read_challenge_solution } from "../../modules/database/challenge_response.js"
-import { generate_challenge } from "../../modules/scoring/challenge_response.js"
+import { generate_challenge, generate_challenges } from "../../modules/scoring/challenge_response.js"
 import { base_url } from "../../modules/networking/url.js"
 
 export const router = Router()
@@ -33,6 +33,40 @@ router.get( '/new', async ( req, res ) => {
     }
 } )
 
+// Largest number of challenges generated by a single batch request
+const max_challenge_batch = 1024
+
+router.post( '/new', async ( req, res ) => {
+
+    const handle_route = async () => {
+
+        // Allow only localhost to call this route
+        if( !request_is_local( req ) ) return { status: 403, error: `Request not from localhost` }
+
+        // Get miner uids from the post body
+        const { miner_uids } = req.body || {}
+        if( !Array.isArray( miner_uids ) || !miner_uids.length ) return { status: 400, error: `miner_uids must be a non-empty array` }
+        if( miner_uids.length > max_challenge_batch ) return { status: 400, error: `At most ${ max_challenge_batch } miner_uids per request` }
+
+        const generated = await generate_challenges( { tags: miner_uids.map( String ) } )
+        const challenges = generated.reduce( ( acc, { tag, challenge, challenge_url } ) => {
+            acc[ tag ] = { challenge, challenge_url }
+            return acc
+        }, {} )
+
+        return { challenges }
+
+    }
+
+    try {
+        const retryable_handler = await make_retryable( handle_route, { retry_times, cooldown_in_s } )
+        const { status, ...response_data } = await retryable_handler()
+        return res.status( status || 200 ).json( response_data )
+    } catch ( error ) {
+        return res.status( 500 ).json( { error: `Error handling new challenges route: ${ error.message }` } )
+    }
+} )
+
 router.get( "/:challenge", async ( req, res ) => {
 
 
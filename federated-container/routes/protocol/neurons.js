@@ -1,7 +1,7 @@
 import { Router } from "express"
 import { is_ipv4, log, make_retryable, require_props, sanetise_ipv4 } from "mentie"
 import { request_is_local } from "../../modules/networking/network.js"
-import { save_tpn_cache_to_disk, set_tpn_cache } from "../../modules/caching.js"
+import { get_tpn_cache, save_tpn_cache_to_disk, set_tpn_cache } from "../../modules/caching.js"
 import { validators_ip_fallback } from "../../modules/networking/validators.js"
 import { cooldown_in_s, retry_times } from "../../modules/networking/routing.js"
 import { map_ips_to_geodata } from "../../modules/geolocation/ip_mapping.js"
@@ -10,6 +10,9 @@ export const router = Router()
 /**
  * Route to handle neuron broadcasts
  * @params {Object} req.body.neurons - Array of neuron objects with properties: uid, ip, validator_trust, trust, alpha_stake, stake_weight, block, hotkey, coldkey
+ * @params {Number} [req.body.version] - Block-stamped version of the broadcast snapshot
+ * @params {Boolean} [req.body.delta] - If true, neurons only contains the uids that changed since base_version
+ * @params {Number} [req.body.base_version] - Version the delta was computed against, must match the last known version
  */
 router.post( "/broadcast/neurons", async ( req, res ) => {
 
@@ -18,13 +21,34 @@ router.post( "/broadcast/neurons", async ( req, res ) => {
     const handle_route = async () => {
 
         // Get neurons from the request
-        const { neurons=[] } = req.body || {}
+        const { neurons=[], version=null, delta=false, base_version=null } = req.body || {}
 
         // Validate that all properties are present
         let valid_entries = neurons.filter( entry => require_props( entry, [ 'uid', 'ip', 'validator_trust', 'trust', 'alpha_stake', 'stake_weight', 'block', 'hotkey', 'coldkey' ], false ) )
-        log.info( `Valid neuron entries: ${ valid_entries.length } of ${ neurons.length } ` )
+        log.info( `Valid neuron ${ delta ? 'delta ' : '' }entries: ${ valid_entries.length } of ${ neurons.length } ` )
         log.insane( valid_entries )
 
+        // Apply deltas on top of the last known neurons, the sender must resend everything if we are out of sync
+        if( delta ) {
+            const known_version = get_tpn_cache( 'last_known_neurons_version', 0 )
+            if( !known_version || known_version != base_version ) {
+                log.info( `Neuron delta against version ${ base_version } does not match known version ${ known_version }` )
+                return { error: `Neuron version mismatch`, version_mismatch: true, version: known_version }
+            }
+            const neurons_by_uid = get_tpn_cache( 'last_known_neurons', [] ).reduce( ( acc, entry ) => {
+                acc[ entry.uid ] = entry
+                return acc
+            }, {} )
+            for( const entry of valid_entries ) neurons_by_uid[ entry.uid ] = entry
+            valid_entries = Object.values( neurons_by_uid )
+        }
+
+        // Remember the raw entries so later deltas can be applied to them
+        if( valid_entries.length > 0 ) {
+            set_tpn_cache( { key: `last_known_neurons`, value: valid_entries } )
+            set_tpn_cache( { key: `last_known_neurons_version`, value: Number( version ) || 0 } )
+        }
+
         // Sanetise the entry data
         valid_entries = valid_entries.map( entry => {
             const { uid, validator_trust, alpha_stake, stake_weight } = entry
@@ -125,6 +149,7 @@ router.post( "/broadcast/neurons", async ( req, res ) => {
             validators: validators.length,
             miners: miners.length,
             weight_copiers: weight_copiers.length,
+            version,
             success: true,
         }
 
@@ -1,4 +1,5 @@
 import { Router } from "express"
+import { createHash } from "crypto"
 import { score_mining_pools } from "../../modules/scoring/score_mining_pools.js"
 import { cache, log } from "mentie"
 import { get_pool_scores } from "../../modules/database/mining_pools.js"
@@ -30,10 +31,18 @@ router.get( '/mining_pools', async ( req, res ) => {
     if( !request_is_local( req ) ) return res.status( 403 ).json( { error: `This endpoint may only be called from localhost` } )
     log.info( `Received request for mining pool scores` )
 
+    // Answer with the scores, or with 304 if the caller already holds this version of them
+    const respond = ( { scores_by_pool, version } ) => {
+        res.set( 'ETag', `"${ version }"` )
+        res.set( 'X-Score-Version', version )
+        if( req.get( 'If-None-Match' ) === `"${ version }"` ) return res.status( 304 ).end()
+        return res.json( scores_by_pool )
+    }
+
     try { 
         // Check for cached value
         const cached_scores = cache( 'mining_pool_scores' )
-        if( cached_scores ) return res.json( cached_scores )
+        if( cached_scores ) return respond( cached_scores )
 
         // Get updated scores
         const { success, message, scores } = await get_pool_scores()
@@ -46,9 +55,13 @@ router.get( '/mining_pools', async ( req, res ) => {
             return acc
         }, {} )
 
+        // Version the scores by their content, so unchanged scores keep their version across refreshes
+        const version = createHash( 'sha1' ).update( JSON.stringify( scores_by_pool ) ).digest( 'hex' )
+
         // Cache and return scores
-        cache( 'mining_pool_scores', scores_by_pool, 5_000 )
-        return res.json( scores_by_pool )
+        const versioned_scores = { scores_by_pool, version }
+        cache( 'mining_pool_scores', versioned_scores, 5_000 )
+        return respond( versioned_scores )
 
     } catch ( e ) {
         log.error( `Error fetching mining pool scores:`, e )
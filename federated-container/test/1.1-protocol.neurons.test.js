@@ -129,4 +129,31 @@ describe( '/protocol/broadcast/neurons endpoint', () => {
 
         } )
     } )
+
+    describe( 'Delta broadcasts', () => {
+        test( 'should apply a delta on top of the last full broadcast', async () => {
+            const full = await json.post( `${ BASE_URL }/protocol/broadcast/neurons`, { neurons: validNeurons, version: 1000 } )
+
+            assert.strictEqual( full.data.success, true )
+            assert.strictEqual( full.data.version, 1000 )
+
+            // Give the miner validator trust, only that neuron is sent
+            const changed_neuron = { ...validNeurons[ 1 ], validator_trust: 0.5 }
+            const { response, data } = await json.post( `${ BASE_URL }/protocol/broadcast/neurons`, { neurons: [ changed_neuron ], delta: true, base_version: 1000, version: 1001 } )
+
+            assert.strictEqual( response.status, 200 )
+            assert.strictEqual( data.success, true )
+            assert.strictEqual( data.version, 1001 )
+            assert.strictEqual( data.validators, 2 )
+            assert.strictEqual( data.miners, 0 )
+        } )
+
+        test( 'should report a version mismatch for a stale delta', async () => {
+            const { response, data } = await json.post( `${ BASE_URL }/protocol/broadcast/neurons`, { neurons: [ validNeurons[ 0 ] ], delta: true, base_version: 1, version: 1002 } )
+
+            assert.strictEqual( response.status, 200 )
+            assert.strictEqual( data.version_mismatch, true )
+            assert.ok( data.error )
+        } )
+    } )
 } )
@@ -37,6 +37,29 @@ describe( '/protocol/challenge endpoints', () => {
         assert.ok( data.challenge_url.includes( data.challenge ) )
     } )
 
+    test( 'should create one challenge per miner uid in a single batch request', async () => {
+        const miner_uids = [ 1, 2, 3 ]
+        const { response, data } = await json.post( `${ BASE_URL }/protocol/challenge/new`, { miner_uids } )
+
+        assert.strictEqual( response.status, 200 )
+        assert.deepStrictEqual( Object.keys( data.challenges ).sort(), [ '1', '2', '3' ] )
+        for( const uid of miner_uids ) {
+            const { challenge, challenge_url } = data.challenges[ uid ]
+            assert.ok( uuidValidate( challenge ), 'challenge must be a valid UUID' )
+            assert.ok( challenge_url.includes( challenge ) )
+        }
+
+        // Batch challenges are solvable like single ones
+        const { data: solveData } = await json.get( `${ BASE_URL }/protocol/challenge/${ data.challenges[ 1 ].challenge }` )
+        assert.ok( typeof extractSolutionString( solveData ) === 'string' )
+    } )
+
+    test( 'should reject a batch request without miner uids', async () => {
+        const { response, data } = await json.post( `${ BASE_URL }/protocol/challenge/new`, { miner_uids: [] } )
+        assert.strictEqual( response.status, 400 )
+        assert.ok( data.error )
+    } )
+
     test( 'should fetch the solution payload for a challenge via /:challenge', async () => {
         const miner_uid = '12345'
         const { data: newData } = await json.get( `${ BASE_URL }/protocol/challenge/new?tag=${ miner_uid }` )
@@ -23,3 +23,29 @@ describe( '/validator/score/force endpoint', () => {
         }
     } )
 } )
+
+describe( '/validator/score/mining_pools endpoint', () => {
+
+    test( 'should tag the scores with a version', async () => {
+        const { response, data } = await json.get( `${ BASE_URL }/validator/score/mining_pools` )
+        assert.strictEqual( response.status, 200 )
+        assert.ok( typeof data === 'object' && data !== null )
+        const etag = response.headers.get( 'etag' )
+        assert.ok( etag )
+        assert.strictEqual( etag, `"${ response.headers.get( 'x-score-version' ) }"` )
+    } )
+
+    test( 'should answer 304 when the scores did not change', async () => {
+        const { response: first } = await json.get( `${ BASE_URL }/validator/score/mining_pools` )
+        const etag = first.headers.get( 'etag' )
+        const { response } = await json.get( `${ BASE_URL }/validator/score/mining_pools`, { headers: { 'If-None-Match': etag } } )
+        assert.strictEqual( response.status, 304 )
+        assert.strictEqual( response.headers.get( 'etag' ), etag )
+    } )
+
+    test( 'should answer the scores for an outdated version', async () => {
+        const { response, data } = await json.get( `${ BASE_URL }/validator/score/mining_pools`, { headers: { 'If-None-Match': '"outdated"' } } )
+        assert.strictEqual( response.status, 200 )
+        assert.ok( typeof data === 'object' && data !== null )
+    } )
+} )
@@ -17,10 +17,8 @@
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 # DEALINGS IN THE SOFTWARE.
 
-import time
 import typing
 import asyncio
-import aiohttp
 import bittensor as bt
 
 import sybil
@@ -28,6 +26,9 @@ import sybil
 # import base miner class which takes care of most of the boilerplate
 from sybil.base.miner import BaseMinerNeuron
 from sybil.base.consts import BURN_UID, BURN_WEIGHT
+from sybil.utils.broadcast import NeuronBroadcaster
+from sybil.utils.singleflight import SingleFlight
+from sybil.utils.runtime import Runtime
 
 
 class Miner(BaseMinerNeuron):
@@ -42,6 +43,12 @@ class Miner(BaseMinerNeuron):
     def __init__(self, config=None):
         super(Miner, self).__init__(config=config)
 
+        # Keeps track of what the miner server already knows so unchanged neurons are not re-sent.
+        self.broadcaster = NeuronBroadcaster(mode=self.config.neuron.broadcast_mode)
+
+        # Validators often send the same challenge within seconds, solve each one once.
+        self.challenges = SingleFlight(ttl=self.config.miner.challenge_cache_ttl)
+
         # TODO(developer): Anything specific to your use case you can do here
 
     async def forward(
@@ -60,21 +67,24 @@ class Miner(BaseMinerNeuron):
         challenge_url = synapse.challenge_url
 
         try:
-            async with aiohttp.ClientSession() as session:
-                bt.logging.info(f"Sending challenge to {self.miner_server}/challenge")
-                async with session.post(
-                    f"{self.miner_server}/challenge",
-                    json={"url": challenge_url},
-                    headers={"Content-Type": "application/json"},
-                ) as response:
-                    response = (await response.json())["response"]
-                    synapse.challenge_response = response
-                    bt.logging.info(f"Solved challenge: {synapse.challenge_response}")
-                    return synapse
+            bt.logging.info(f"Sending challenge to {self.miner_server}/challenge")
+            synapse.challenge_response = await self.challenges.do(
+                challenge_url, lambda: self.solve_challenge(challenge_url)
+            )
+            bt.logging.info(f"Solved challenge: {synapse.challenge_response}")
+            return synapse
         except Exception as e:
             bt.logging.error(f"Error solving challenge: {e}")
             return synapse
 
+    async def solve_challenge(self, challenge_url: str) -> str:
+        """
+        Asks the miner server to solve a challenge. Only successful answers are returned, so errors are never cached.
+        """
+        with self.stage_timings["upstream"].time():
+            result = await self.http.post_json("/challenge", {"url": challenge_url})
+        return result["response"]
+
     async def blacklist(
         self, synapse: sybil.protocol.Challenge
     ) -> typing.Tuple[bool, str]:
@@ -103,7 +113,7 @@ class Miner(BaseMinerNeuron):
 
         In practice it would be wise to blacklist requests from entities that are not validators, or do not have
         enough stake. This can be checked via metagraph.S and metagraph.validator_permit. You can always attain
-        the uid of the sender via a metagraph.hotkeys.index( synapse.dendrite.hotkey ) call.
+        the uid of the sender via a self.hotkey_table[ synapse.dendrite.hotkey ].uid lookup.
 
         Otherwise, allow the request to be processed further.
         """
@@ -115,11 +125,8 @@ class Miner(BaseMinerNeuron):
             return True, "Missing dendrite or hotkey"
 
         # TODO(developer): Define how miners should blacklist requests.
-        uid = self.metagraph.hotkeys.index(synapse.dendrite.hotkey)
-        if (
-            not self.config.blacklist.allow_non_registered
-            and synapse.dendrite.hotkey not in self.metagraph.hotkeys
-        ):
+        entry = self.hotkey_table.get(synapse.dendrite.hotkey)
+        if entry is None and not self.config.blacklist.allow_non_registered:
             # Ignore requests from un-registered entities.
             bt.logging.trace(
                 f"Blacklisting un-registered hotkey {synapse.dendrite.hotkey}"
@@ -128,7 +135,7 @@ class Miner(BaseMinerNeuron):
 
         if self.config.blacklist.force_validator_permit:
             # If the config is set to force validator permit, then we should only allow requests from validators.
-            if not self.metagraph.validator_permit[uid]:
+            if entry is None or not entry.validator_permit:
                 bt.logging.warning(
                     f"Blacklisting a request from non-validator hotkey {synapse.dendrite.hotkey}"
                 )
@@ -166,12 +173,9 @@ class Miner(BaseMinerNeuron):
             return 0.0
 
         # TODO(developer): Define how miners should prioritize requests.
-        caller_uid = self.metagraph.hotkeys.index(
-            synapse.dendrite.hotkey
-        )  # Get the caller index.
-        priority = float(
-            self.metagraph.S[caller_uid]
-        )  # Return the stake as the priority.
+        entry = self.hotkey_table.get(synapse.dendrite.hotkey)
+        # Return the stake as the priority, unknown callers go last.
+        priority = entry.priority if entry is not None else 0.0
         bt.logging.trace(
             f"Prioritizing {synapse.dendrite.hotkey} with value: {priority}"
         )
@@ -182,77 +186,97 @@ class Miner(BaseMinerNeuron):
         Broadcast the neurons to the miner server.
         """
         bt.logging.info(f"Broadcasting neurons to {self.miner_server}/protocol/broadcast/neurons")
-
-        neurons_info = []
-        block = int(self.metagraph.block)
-        for neuron in self.metagraph.neurons:
-            uid = neuron.uid
-            neurons_info.append({
-                'uid': uid,
-                'ip': self.metagraph.axons[uid].ip,
-                'validator_trust': neuron.validator_trust,
-                'trust': neuron.trust,
-                "alpha_stake": float(self.metagraph.alpha_stake[uid].item()),
-                'stake_weight': float(self.metagraph.S[uid].item()),
-                'block': block,
-                'hotkey': neuron.hotkey,
-                'coldkey': neuron.coldkey,
-                'excluded': uid == BURN_UID,
-            })
-        bt.logging.info(f"Submitting neurons info: {len(neurons_info)} neurons")
-        try:     
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.miner_server}/protocol/broadcast/neurons",
-                    json={"neurons": neurons_info}
-                ) as resp:
-                    result = await resp.json()
-                    if result["success"]:
-                        bt.logging.info(f"Broadcasted neurons info: {len(neurons_info)} neurons")
-                    else:
-                        bt.logging.error(f"Failed to broadcast neurons info")
+        try:
+            await self.broadcaster.broadcast(self.metagraph, self.http.post_json)
         except Exception as e:
             bt.logging.error(f"Failed to broadcast neurons info: {e}")
 
 
-def check_if_miner_registered(neuron):
+class RegistrationWatchdog:
     """
-    Check if the miner is registered in the metagraph.
+    Watches that the miner hotkey stays registered without opening a chain connection of its own.
+
+    The check reuses the metagraph the neuron already keeps in sync and only runs again once that metagraph has
+    moved to a new block. A single `is_hotkey_registered` query confirms a missing hotkey before the miner exits,
+    so the watchdog costs no chain calls while the miner is registered.
     """
-    
-    subtensor = bt.subtensor(config=neuron.config)
-    metagraph = subtensor.metagraph(neuron.config.netuid)
 
-    is_registered = neuron.wallet.hotkey.ss58_address in metagraph.hotkeys
-    if not is_registered:
-        bt.logging.error(f"Miner {neuron.wallet.hotkey.ss58_address} is not registered in the metagraph")
-        exit()
-    else:
-        bt.logging.info(f"Neuron registration check passed")
+    def __init__(self, neuron: BaseMinerNeuron):
+        self.neuron = neuron
+        self.last_block = None
+        self.checks = 0
+        self.rpc_calls = 0
+
+    def check(self) -> bool:
+        """
+        Check if the miner is registered in the metagraph.
+
+        Returns:
+            bool: False if the miner is no longer registered.
+        """
+        block = int(self.neuron.metagraph.block)
+        if block == self.last_block:
+            return True
+        self.last_block = block
+        self.checks += 1
+
+        hotkey = self.neuron.wallet.hotkey.ss58_address
+        is_registered = hotkey in self.neuron.hotkey_table
+        if not is_registered:
+            # The metagraph may lag behind the chain, confirm before exiting.
+            self.rpc_calls += 1
+            is_registered = self.neuron.subtensor.is_hotkey_registered(
+                netuid=self.neuron.config.netuid, hotkey_ss58=hotkey
+            )
+
+        if not is_registered:
+            bt.logging.error(f"Miner {hotkey} is not registered in the metagraph")
+        else:
+            bt.logging.info(
+                f"Neuron registration check passed at block {block} (checks: {self.checks}, rpc calls: {self.rpc_calls})"
+            )
+        return is_registered
+
+
+async def main():
+    miner = Miner()
+    watchdog = RegistrationWatchdog(miner)
+    runtime = Runtime(jitter=0.1)
+
+    def run_epoch() -> bool:
+        # The registration check shares the miner's chain connection, which must not be used from two threads at
+        # once, so it runs in the epoch thread right after the sync that moved the metagraph to a new block.
+        if not miner.run_epoch():
+            return False
+        if not watchdog.check():
+            runtime.stop()
+            return False
+        return True
+
+    async def sync_metagraph():
+        # Chain sync blocks, run each epoch in a worker thread. Returns once the miner is shut down.
+        while await asyncio.to_thread(run_epoch):
+            pass
+
+    async def report_health():
+        bt.logging.info(f"Challenge cache: {miner.challenges.stats()}")
+        bt.logging.info(f"Admission: {miner.admission.stats()}")
+        bt.logging.info(f"Epochs: {miner.epochs.stats()}")
+        bt.logging.info(f"Tasks: {runtime.stats()}")
+
+    # Registration check, initial sync and serving the axon, before anything is scheduled.
+    await asyncio.to_thread(miner.start)
+    if not await asyncio.to_thread(watchdog.check):
+        runtime.stop()
+
+    runtime.every("broadcast", 60, miner.broadcast_neurons, timeout=30)
+    runtime.every("health", 60, report_health)
+    runtime.spawn("metagraph", sync_metagraph)
+    runtime.on_shutdown(miner.shutdown)
+    runtime.on_shutdown(miner.http.close)
+    await runtime.run()
+
 
 # This is the main function, which runs the miner.
 if __name__ == "__main__":
-    with Miner() as miner:
-        # Create event loop if not already running
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-        async def periodic_broadcast():
-            last_broadcast = None
-            broadcast_interval_minutes = 1
-            while True: 
-                check_if_miner_registered(miner)
-                if last_broadcast is None or time.time() - last_broadcast > broadcast_interval_minutes * 60:
-                    await miner.broadcast_neurons()
-                    last_broadcast = time.time()
-                await asyncio.sleep(60)  # 60 seconds between broadcasts
-
-        # Run the periodic broadcast in the background
-        loop.run_until_complete(periodic_broadcast())
-        
-        while True:
-            bt.logging.info(f"Miner running... {time.time()}")
-            time.sleep(20)
+    asyncio.run(main())
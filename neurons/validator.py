@@ -21,7 +21,6 @@
 import os
 import time
 import datetime
-import requests
 
 # Bittensor
 import bittensor as bt
@@ -31,7 +30,10 @@ import wandb
 from sybil.base.validator import BaseValidatorNeuron
 
 # Bittensor Validator Template:
-from sybil.validator import forward
+from sybil.validator import forward, score_mining_pools
+from sybil.utils.broadcast import NeuronBroadcaster
+from sybil.validator.pool_scores import PoolScoreFetcher
+from sybil.utils.http import run_sync, validator_server_client
 
 
 class Validator(BaseValidatorNeuron):
@@ -45,6 +47,11 @@ class Validator(BaseValidatorNeuron):
 
     def __init__(self, config=None):
         super(Validator, self).__init__(config=config)
+
+        # Keeps track of what the validator server already knows so unchanged neurons are not re-sent.
+        self.broadcaster = NeuronBroadcaster(mode=self.config.neuron.broadcast_mode)
+        # Keeps track of the version of the mining pool scores last applied so unchanged scores are skipped.
+        self.pool_scores = PoolScoreFetcher()
         
         bt.logging.info(f"===> Validator initialized: {self.step}, {len(self.scores)}, {len(self.hotkeys)}")
 
@@ -85,9 +92,9 @@ class Validator(BaseValidatorNeuron):
 
         bt.logging.debug(f"Started a new wandb run: {name}")
 
-    async def forward(self):
+    async def forward(self, miner_uids):
         """
-        Validator forward pass. Consists of:
+        Validator forward pass over one shard of miners. Consists of:
         - Generating the query
         - Querying the miners
         - Getting the responses
@@ -95,16 +102,22 @@ class Validator(BaseValidatorNeuron):
         - Updating the scores
         """
         # TODO(developer): Rewrite this function based on your protocol definition.
-        return await forward(self)
+        return await forward(self, miner_uids)
+
+    async def shared_forward(self):
+        """
+        Work shared by every forward of a step: broadcasting the neurons and scoring the mining pools.
+        """
+        return await score_mining_pools(self)
 
 def check_validator_server(validator_server_url) -> bool:
     try:
-        with requests.get(f"{validator_server_url}/") as resp:
-            if resp.ok:
-                bt.logging.info("Validator server is running")
-            else:
-                bt.logging.error(f"Validator server returned error: {resp.status_code}")
-                return False
+        status = run_sync(validator_server_client(validator_server_url).get_status("/"))
+        if status < 400:
+            bt.logging.info("Validator server is running")
+        else:
+            bt.logging.error(f"Validator server returned error: {status}")
+            return False
         return True
     except Exception as e:
         bt.logging.error(f"Failed to connect to validator server: {e}")
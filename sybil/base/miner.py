@@ -17,16 +17,47 @@
 
 import time
 import asyncio
+import functools
 import threading
 import argparse
 import traceback
 
 import bittensor as bt
 
+from collections import OrderedDict
+
 from sybil.base.neuron import BaseNeuron
 from sybil.utils.config import add_miner_args
+from sybil.utils.http import PooledClient
+from sybil.utils.admission import AdmissionController, AdmissionRejected
+from sybil.utils.metrics import REGISTRY
+from sybil.utils.epoch import EpochScheduler
+
+from typing import Dict, NamedTuple, Optional, Tuple, Union
+
+# Stages of a miner request that are timed into latency histograms.
+MINER_STAGES = ("blacklist", "priority", "queue", "upstream", "forward", "serialize")
+
+# Priorities computed by the axon and not yet picked up by admission control, kept at most.
+MAX_PENDING_PRIORITIES = 4096
+
+
+class HotkeyInfo(NamedTuple):
+    """Per-hotkey facts the axon needs to admit a request, precomputed from the metagraph."""
 
-from typing import Union
+    uid: int
+    validator_permit: bool
+    priority: float
+
+
+def request_key(synapse: bt.Synapse) -> Optional[Tuple[str, int]]:
+    """
+    Returns the hotkey and nonce identifying the request of `synapse`, None if it has neither.
+    """
+    dendrite = synapse.dendrite
+    if dendrite is None or dendrite.hotkey is None or dendrite.nonce is None:
+        return None
+    return dendrite.hotkey, dendrite.nonce
 
 
 class BaseMinerNeuron(BaseNeuron):
@@ -61,15 +92,70 @@ class BaseMinerNeuron(BaseNeuron):
 
         self.miner_server = self.config.miner.server
 
+        # Shared keep-alive connection pool to the miner server, used by every forward.
+        self.http = PooledClient(
+            self.miner_server,
+            limit=self.config.miner.http.limit,
+            timeout=self.config.miner.http.timeout,
+            connect_timeout=self.config.miner.http.connect_timeout,
+            keepalive_timeout=self.config.miner.http.keepalive_timeout,
+        )
+
+        # Warm up the pool on the axon's own event loop once it starts serving.
+        if self.config.miner.http.warmup_connections > 0:
+            self.axon.app.add_event_handler("startup", self.warmup_http)
+
+        # Bounds concurrent forwards and sheds low priority requests first when the miner server falls behind.
+        self.admission = AdmissionController(
+            max_concurrency=self.config.miner.max_concurrent_forwards,
+            max_queue=self.config.miner.max_queue_depth,
+            max_wait=self.config.miner.max_queue_wait,
+        )
+
+        # Latency histograms for every stage of a request.
+        self.stage_timings = {
+            stage: REGISTRY.histogram(
+                "miner_request_stage_seconds",
+                "Time spent in each stage of a miner request.",
+                {"stage": stage},
+            )
+            for stage in MINER_STAGES
+        }
+        self.admission_rejections = REGISTRY.counter(
+            "miner_admission_rejected_total",
+            "Requests rejected by admission control.",
+        )
+        # Priority the axon computed for every request, reused by admission control instead of computing it again.
+        self.pending_priorities: "OrderedDict[Tuple[str, int], float]" = OrderedDict()
+
         # Attach determiners which functions are called when servicing a request.
         bt.logging.info(f"Attaching forward function to miner axon.")
         self.axon.attach(
-            forward_fn=self.forward,
-            blacklist_fn=self.blacklist,
-            priority_fn=self.priority,
+            forward_fn=self.admitted(self.forward),
+            blacklist_fn=self.timed("blacklist", self.blacklist),
+            priority_fn=self.timed("priority", self.remembered(self.priority)),
+        )
+        self.axon.middleware_cls = timed_middleware(
+            self.axon.middleware_cls, self.stage_timings["serialize"]
         )
         bt.logging.info(f"Axon created: {self.axon}")
 
+        if self.config.neuron.metrics_port > 0:
+            REGISTRY.serve(self.config.neuron.metrics_port)
+
+        # Hotkey lookup table used by blacklist and priority.
+        self.hotkey_table: Dict[str, HotkeyInfo] = {}
+        self.build_hotkey_table()
+
+        # Sleeps until the next epoch boundary instead of polling the chain.
+        self.epochs = EpochScheduler(
+            self.subtensor,
+            epoch_length=self.config.neuron.epoch_length,
+            block_time=self.config.neuron.block_time,
+            subscribe=self.config.miner.subscribe_blocks,
+            labels={"neuron": "miner"},
+        )
+
         # Instantiate runners
         self.should_exit: bool = False
         self.is_running: bool = False
@@ -99,6 +185,27 @@ class BaseMinerNeuron(BaseNeuron):
             Exception: For unforeseen errors during the miner's operation, which are logged for diagnosis.
         """
 
+        self.start()
+
+        # This loop maintains the miner's operations until intentionally stopped.
+        try:
+            while not self.should_exit and self.run_epoch():
+                pass
+
+        # If someone intentionally stops the miner, it'll safely terminate operations.
+        except KeyboardInterrupt:
+            self.axon.stop()
+            bt.logging.success("Miner killed by keyboard interrupt.")
+            exit()
+
+        # In case of unforeseen errors, the miner will log the error and continue operations.
+        except Exception as e:
+            bt.logging.error(traceback.format_exc())
+
+    def start(self):
+        """
+        Checks the miner is registered, then serves its axon on the network and starts it.
+        """
         # Check that miner is registered on the network.
         self.sync()
 
@@ -114,33 +221,97 @@ class BaseMinerNeuron(BaseNeuron):
 
         bt.logging.info(f"Miner starting at block: {self.block}")
 
-        # This loop maintains the miner's operations until intentionally stopped.
-        try:
-            while not self.should_exit:
-                while (
-                    self.block - self.metagraph.last_update[self.uid]
-                    < self.config.neuron.epoch_length
-                ):
-                    # Wait before checking again.
-                    time.sleep(1)
-
-                    # Check if we should exit.
-                    if self.should_exit:
-                        break
-
-                # Sync metagraph and potentially set weights.
-                self.sync()
-                self.step += 1
+    def run_epoch(self) -> bool:
+        """
+        Sleeps until the next epoch boundary, then syncs the metagraph.
 
-        # If someone intentionally stops the miner, it'll safely terminate operations.
-        except KeyboardInterrupt:
-            self.axon.stop()
-            bt.logging.success("Miner killed by keyboard interrupt.")
-            exit()
+        Returns:
+            bool: False if the miner was stopped while waiting.
+        """
+        block = self.epochs.wait(int(self.metagraph.last_update[self.uid]))
+        if block is None:
+            return False
 
-        # In case of unforeseen errors, the miner will log the error and continue operations.
-        except Exception as e:
-            bt.logging.error(traceback.format_exc())
+        # Sync metagraph and potentially set weights.
+        self.sync()
+        self.step += 1
+        bt.logging.info(f"Epoch at block {block}: {self.epochs.stats()}")
+        return True
+
+    def shutdown(self):
+        """
+        Stops the epoch loop, the axon, the connections to the miner server and the metrics server.
+        """
+        self.should_exit = True
+        self.epochs.stop()
+        self.http.close_threadsafe()
+        self.axon.stop()
+        REGISTRY.shutdown()
+
+    def admitted(self, forward_fn):
+        """
+        Wraps a forward function so it only runs once admission control grants it a slot. The wrapper keeps the
+        signature of `forward_fn`, which the axon uses to route requests.
+        """
+
+        @functools.wraps(forward_fn)
+        async def forward(synapse):
+            key = request_key(synapse)
+            priority = self.pending_priorities.pop(key, None) if key is not None else None
+            if priority is None:
+                priority = await self.priority(synapse)
+            try:
+                waited = await self.admission.acquire(priority)
+            except AdmissionRejected:
+                self.admission_rejections.inc()
+                raise
+            self.stage_timings["queue"].observe(waited)
+            try:
+                with self.stage_timings["forward"].time():
+                    return await forward_fn(synapse)
+            finally:
+                self.admission.release()
+
+        return forward
+
+    def remembered(self, priority_fn):
+        """
+        Wraps the priority function so the priority it computes for a request is kept until admission control picks
+        it up, keeping its signature. The axon hands the forward function a synapse of its own, parsed from the
+        request body, so the priority is looked up by the hotkey and nonce both synapses carry.
+        """
+
+        @functools.wraps(priority_fn)
+        async def priority(synapse):
+            value = await priority_fn(synapse)
+            key = request_key(synapse)
+            if key is not None:
+                self.pending_priorities[key] = value
+                # Requests dropped between priority and forward would otherwise leave their entry behind.
+                while len(self.pending_priorities) > MAX_PENDING_PRIORITIES:
+                    self.pending_priorities.popitem(last=False)
+            return value
+
+        return priority
+
+    def timed(self, stage: str, fn):
+        """
+        Wraps an axon coroutine function so its duration is recorded under `stage`, keeping its signature.
+        """
+        histogram = self.stage_timings[stage]
+
+        @functools.wraps(fn)
+        async def timed_fn(synapse):
+            with histogram.time():
+                return await fn(synapse)
+
+        return timed_fn
+
+    async def warmup_http(self):
+        """
+        Pre-opens connections to the miner server so the first challenges do not pay for connection setup.
+        """
+        await self.http.warmup(self.config.miner.http.warmup_connections)
 
     def run_in_background_thread(self):
         """
@@ -162,8 +333,11 @@ class BaseMinerNeuron(BaseNeuron):
         if self.is_running:
             bt.logging.debug("Stopping miner in background thread.")
             self.should_exit = True
+            self.epochs.stop()
             if self.thread is not None:
                 self.thread.join(5)
+            self.http.close_threadsafe()
+            REGISTRY.shutdown()
             self.is_running = False
             bt.logging.debug("Stopped")
 
@@ -196,6 +370,36 @@ class BaseMinerNeuron(BaseNeuron):
 
         # Sync the metagraph.
         self.metagraph.sync(subtensor=self.subtensor)
-        
+
+        # Rebuild the hotkey lookup table for the new metagraph.
+        self.build_hotkey_table()
+
+    def build_hotkey_table(self):
+        """
+        Builds a hotkey -> (uid, validator_permit, priority) table from the metagraph so that blacklist and priority
+        answer with a single dict lookup instead of scanning the hotkey list on every request. The new table is built
+        aside and swapped in with one assignment, so concurrent readers always see a complete table.
+        """
+        permits = self.metagraph.validator_permit.tolist()
+        stakes = self.metagraph.S.tolist()
+        self.hotkey_table = {
+            hotkey: HotkeyInfo(uid, bool(permits[uid]), float(stakes[uid]))
+            for uid, hotkey in enumerate(self.metagraph.hotkeys)
+        }
+
     def init_state(self):
         self.step = 0
+
+
+def timed_middleware(middleware_cls, histogram):
+    """
+    Returns a subclass of the axon middleware that records how long turning a synapse into a response takes.
+    """
+
+    class TimedMiddleware(middleware_cls):
+        @classmethod
+        async def synapse_to_response(cls, *args, **kwargs):
+            with histogram.time():
+                return await super().synapse_to_response(*args, **kwargs)
+
+    return TimedMiddleware
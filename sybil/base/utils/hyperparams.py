@@ -0,0 +1,171 @@
+import threading
+import bittensor
+
+from typing import Dict, NamedTuple, Optional
+
+from bittensor.utils import u16_normalized_float
+
+from sybil.utils.metrics import REGISTRY
+
+# RPCs process_weights_for_netuid made per call before the cache: min_allowed_weights and max_weight_limit.
+UNCACHED_RPCS = 2
+
+
+class WeightHyperparameters(NamedTuple):
+    """The subnet hyperparameters weight processing depends on, as read at `block`."""
+
+    min_allowed_weights: int
+    max_weight_limit: float
+    tempo: int
+    n: int
+    block: int
+
+
+class HyperparameterCache:
+    """
+    Caches the subnet hyperparameters used to process weights, keyed by netuid.
+
+    An entry is read from the chain at most once per tempo: it expires `tempo` blocks after the block it was read at,
+    or earlier at a boundary set with `expire_at`. A refresh reads every hyperparameter with a single runtime API call
+    when the chain supports it, and the size of the subnet along with them, so callers without a metagraph do not
+    have to download one. Hits, misses and the chain calls made are counted in the metrics registry and `stats()`,
+    along with the calls saved compared to reading the hyperparameters on every call.
+    """
+
+    def __init__(self):
+        self.entries: Dict[int, WeightHyperparameters] = {}
+        self.boundaries: Dict[int, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.rpcs = 0
+        self.uncached_rpcs = 0
+        self._lock = threading.Lock()
+        self.hit_counter = REGISTRY.counter(
+            "subnet_hyperparameter_cache_hits_total", "Weight processing calls served from the hyperparameter cache."
+        )
+        self.miss_counter = REGISTRY.counter(
+            "subnet_hyperparameter_cache_misses_total", "Weight processing calls that read hyperparameters from chain."
+        )
+        self.saved_gauge = REGISTRY.gauge(
+            "subnet_hyperparameter_rpcs_saved", "Chain calls saved by the hyperparameter cache."
+        )
+
+    def get(
+        self,
+        subtensor: "bittensor.subtensor",
+        netuid: int,
+        block: Optional[int] = None,
+        with_metagraph: bool = True,
+    ) -> WeightHyperparameters:
+        """
+        Returns the weight hyperparameters of `netuid`, reading them from chain if the cached ones expired.
+
+        Args:
+            subtensor (bittensor.subtensor): Chain connection used on a miss.
+            netuid (int): The subnet.
+            block (int): The current block, read from chain if not given.
+            with_metagraph (bool): Whether the caller has a metagraph, only used to count the calls saved.
+
+        Returns:
+            WeightHyperparameters: The cached or freshly read hyperparameters.
+        """
+        rpcs = 0
+        if block is None:
+            block = int(subtensor.get_current_block())
+            rpcs += 1
+
+        with self._lock:
+            entry = self.entries.get(netuid)
+            if entry is not None and not self._expired(netuid, entry, block):
+                self.hits += 1
+                self.hit_counter.inc()
+                self._account(rpcs, with_metagraph)
+                return entry
+
+        entry, read_rpcs = self._read(subtensor, netuid, block)
+        with self._lock:
+            self.entries[netuid] = entry
+            self.boundaries.pop(netuid, None)
+            self.misses += 1
+            self.miss_counter.inc()
+            self._account(rpcs + read_rpcs, with_metagraph)
+        bittensor.logging.debug(f"Read weight hyperparameters of netuid {netuid} at block {block}: {entry}")
+        return entry
+
+    def expire_at(self, netuid: int, block: int):
+        """
+        Expires the cached hyperparameters of `netuid` once `block` is reached, e.g. at a known epoch boundary.
+        """
+        with self._lock:
+            self.boundaries[netuid] = min(block, self.boundaries.get(netuid, block))
+
+    def invalidate(self, netuid: Optional[int] = None):
+        """
+        Drops the cached hyperparameters of `netuid`, or of every subnet.
+        """
+        with self._lock:
+            if netuid is None:
+                self.entries.clear()
+                self.boundaries.clear()
+            else:
+                self.entries.pop(netuid, None)
+                self.boundaries.pop(netuid, None)
+
+    def _expired(self, netuid: int, entry: WeightHyperparameters, block: int) -> bool:
+        if block >= entry.block + max(entry.tempo, 1) or block < entry.block:
+            return True
+        boundary = self.boundaries.get(netuid)
+        return boundary is not None and block >= boundary
+
+    def _account(self, rpcs: int, with_metagraph: bool):
+        self.rpcs += rpcs
+        # A call without metagraph also downloaded the whole metagraph before.
+        self.uncached_rpcs += UNCACHED_RPCS + (0 if with_metagraph else 1)
+        self.saved_gauge.set(self.rpcs_saved)
+
+    def _read(self, subtensor: "bittensor.subtensor", netuid: int, block: int):
+        # Read at the head of the chain, `block` may be older than what a lite node keeps state for.
+        try:
+            params = subtensor.get_subnet_hyperparameters(netuid=netuid)
+        except Exception as e:
+            bittensor.logging.debug(f"Failed to read the hyperparameters of netuid {netuid} at once: {e}")
+            params = None
+
+        if params is not None:
+            max_weight_limit = params.max_weight_limit
+            # The runtime API answers the raw u16 value.
+            if isinstance(max_weight_limit, int):
+                max_weight_limit = u16_normalized_float(max_weight_limit)
+            min_allowed_weights, tempo, rpcs = params.min_allowed_weights, params.tempo, 1
+        else:
+            min_allowed_weights = subtensor.min_allowed_weights(netuid=netuid)
+            max_weight_limit = subtensor.max_weight_limit(netuid=netuid)
+            tempo = subtensor.tempo(netuid=netuid)
+            # The failed combined read and the three single ones.
+            rpcs = 4
+
+        n = subtensor.subnetwork_n(netuid=netuid)
+        entry = WeightHyperparameters(
+            min_allowed_weights=int(min_allowed_weights),
+            max_weight_limit=float(max_weight_limit),
+            tempo=int(tempo or 0),
+            n=int(n or 0),
+            block=block,
+        )
+        return entry, rpcs + 1
+
+    @property
+    def rpcs_saved(self) -> int:
+        return self.uncached_rpcs - self.rpcs
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "rpcs": self.rpcs,
+            "rpcs_saved": self.rpcs_saved,
+        }
+
+
+# Process wide cache shared by every caller of process_weights_for_netuid.
+HYPERPARAMETERS = HyperparameterCache()
@@ -18,26 +18,36 @@
 # DEALINGS IN THE SOFTWARE.
 
 
-import copy
+import time
+import logging
 import numpy as np
 import asyncio
 import argparse
 import threading
 import bittensor as bt
-import requests
 import os
 
-from typing import List, Union
+from typing import List, Optional, Union
 from traceback import print_exception
 
 from sybil.base.neuron import BaseNeuron
 from sybil.base.utils.weight_utils import (
+    l1_normalize,
     process_weights_for_netuid,
     convert_weights_and_uids_for_emit,
 )  # TODO: Replace when bittensor switches to numpy
 from sybil.mock import MockDendrite
 from sybil.utils.config import add_validator_args
 from sybil.base.consts import BURN_UID, BURN_WEIGHT
+from sybil.validator.ema import ScoreUpdater
+from sybil.validator.scheduler import StepScheduler
+from sybil.validator.weights import WeightSubmitter
+from sybil.utils.logging import log_enabled
+from sybil.utils.metrics import REGISTRY
+from sybil.utils.fingerprint import MetagraphFingerprint
+from sybil.utils.broadcast import BalancePublisher
+from sybil.utils.http import run_background, validator_server_client
+from sybil.utils.uids import get_random_uids, split_uids
 
 class BaseValidatorNeuron(BaseNeuron):
     """
@@ -55,7 +65,17 @@ class BaseValidatorNeuron(BaseNeuron):
         super().__init__(config=config)
 
         # Save a copy of the hotkeys to local memory.
-        self.hotkeys = copy.deepcopy(self.metagraph.hotkeys)
+        self.hotkeys = self.metagraph.hotkeys
+        # Hotkeys and axons as of the last resync, to find what changed on the next one.
+        self.fingerprint: Optional[MetagraphFingerprint] = None
+        # Block the metagraph was last synced at.
+        self.last_sync_block: Optional[int] = None
+        self.resync_seconds = REGISTRY.histogram(
+            "validator_resync_seconds", "Time taken to resync the metagraph and the moving averages."
+        )
+        self.resync_changed_uids = REGISTRY.counter(
+            "validator_resync_replaced_uids_total", "Uids whose scores were reset because their hotkey changed."
+        )
 
         # Dendrite lets us send messages to other nodes (axons) in the network.
         if self.config.mock:
@@ -64,6 +84,32 @@ class BaseValidatorNeuron(BaseNeuron):
             self.dendrite = bt.dendrite(wallet=self.wallet)
         bt.logging.info(f"Dendrite: {self.dendrite}")
 
+        # Sends the miner balances that changed to the node container in the background.
+        self.balance_publisher = BalancePublisher(
+            validator_server_client(self.validator_server_url).post_json,
+            run_background,
+            threshold=self.config.neuron.balance_threshold,
+        )
+
+        # Sets weights on chain from a background thread, through a connection of its own.
+        self.weight_submitter = WeightSubmitter(
+            (lambda: self.subtensor) if self.config.mock else (lambda: bt.subtensor(config=self.config)),
+            self.wallet,
+            self.config.netuid,
+            self.uid,
+            self.spec_version,
+            max_attempts=self.config.neuron.weight_submit_attempts,
+            backoff=self.config.neuron.weight_submit_backoff,
+            l1_threshold=self.config.neuron.weight_l1_threshold,
+            linf_threshold=self.config.neuron.weight_linf_threshold,
+            refresh_blocks=self.config.neuron.weight_refresh_blocks,
+        )
+        # Block weights were last computed at, whether they were submitted or skipped.
+        self.last_weights_block: Optional[int] = None
+
+        # Applies rewards to the moving average scores in place.
+        self.score_updater = ScoreUpdater(self.config.neuron.moving_average_alpha)
+
         # Init sync with the network. Updates the metagraph.
         self.resync_metagraph()
         bt.logging.info(f"===> Resynced metagraph: {self.step}, {len(self.scores)}, {len(self.hotkeys)}")
@@ -78,6 +124,9 @@ class BaseValidatorNeuron(BaseNeuron):
         # Create asyncio event loop to manage async tasks.
         self.loop = asyncio.get_event_loop()
 
+        # Paces forward steps without blocking the event loop.
+        self.step_scheduler = StepScheduler(self.config.neuron.step_interval)
+
         # Instantiate runners
         self.should_exit: bool = False
         self.is_running: bool = False
@@ -110,11 +159,24 @@ class BaseValidatorNeuron(BaseNeuron):
             pass
 
     async def concurrent_forward(self):
-        coroutines = [
-            self.forward()
-            for _ in range(self.config.neuron.num_concurrent_forwards)
-        ]
-        await asyncio.gather(*coroutines)
+        """
+        Runs one step. The work shared by every forward runs once, while `neuron.sample_size` miners are split into
+        disjoint shards, one per concurrent forward.
+        """
+        async with self.step_scheduler.step():
+            miner_uids = get_random_uids(self, k=self.config.neuron.sample_size)
+            shards = split_uids(miner_uids, self.config.neuron.num_concurrent_forwards)
+            bt.logging.info(
+                f"Step {self.step}: {len(miner_uids)} miners in {len(shards)} shards"
+            )
+            coroutines = [self.shared_forward()] + [self.forward(shard) for shard in shards]
+            await asyncio.gather(*coroutines)
+
+    async def shared_forward(self):
+        """
+        Work shared by every forward of a step, run once per step. Does nothing unless overridden.
+        """
+        pass
 
     def run(self):
         """
@@ -192,6 +254,7 @@ class BaseValidatorNeuron(BaseNeuron):
             bt.logging.debug("Stopping validator in background thread.")
             self.should_exit = True
             self.thread.join(5)
+            self.weight_submitter.stop()
             self.is_running = False
             bt.logging.debug("Stopped")
 
@@ -216,31 +279,41 @@ class BaseValidatorNeuron(BaseNeuron):
             bt.logging.debug("Stopping validator in background thread.")
             self.should_exit = True
             self.thread.join(5)
+            self.weight_submitter.stop()
             self.is_running = False
             bt.logging.debug("Stopped")
 
-    def set_weights(self):
+    def should_sync_metagraph(self) -> bool:
         """
-        Sets the validator weights to the metagraph hotkeys based on the scores it has received from the miners. The weights determine the trust and incentive level the validator assigns to miner nodes on the network.
+        Skipped weights leave the last update on chain behind, so the metagraph is also not synced again until an
+        epoch passed since it last was.
         """
+        if not super().should_sync_metagraph():
+            return False
+        return (
+            self.last_sync_block is None
+            or self.block - self.last_sync_block > self.config.neuron.epoch_length
+        )
 
-        # Check if self.scores contains any NaN values and log a warning if it does.
-        if np.isnan(self.scores).any():
-            bt.logging.warning(
-                f"Scores contain NaN values. This may be due to a lack of responses from miners, or a bug in your reward functions."
-            )
-
-        # Calculate the average reward for each uid across non-zero values.
-        # Replace any NaN values with 0.
-        # Compute the norm of the scores
-        norm = np.linalg.norm(self.scores, ord=1, axis=0, keepdims=True)
+    def should_set_weights(self) -> bool:
+        """
+        Skipped weights leave the last update on chain behind, so weights are also not computed again until an epoch
+        passed since they last were.
+        """
+        if not super().should_set_weights():
+            return False
+        return (
+            self.last_weights_block is None
+            or self.block - self.last_weights_block > self.config.neuron.epoch_length
+        )
 
-        # Check if the norm is zero or contains NaN values
-        if np.any(norm == 0) or np.isnan(norm).any():
-            norm = np.ones_like(norm)  # Avoid division by zero or NaN
+    def set_weights(self):
+        """
+        Sets the validator weights to the metagraph hotkeys based on the scores it has received from the miners. The weights determine the trust and incentive level the validator assigns to miner nodes on the network.
+        """
 
-        # Compute raw_weights safely
-        raw_weights = self.scores / norm
+        # Normalize the scores to sum to 1.
+        raw_weights = l1_normalize(self.scores)
 
         bt.logging.debug("raw_weights", raw_weights)
         bt.logging.debug("raw_weight_uids", str(self.metagraph.uids.tolist()))
@@ -270,145 +343,83 @@ class BaseValidatorNeuron(BaseNeuron):
         bt.logging.debug("uint_weights", uint_weights)
         bt.logging.debug("uint_uids", uint_uids)
 
-        # Set the weights on chain via our subtensor connection.
-        # Retry 20 times if it fails
-        for _ in range(20):
-            result, msg = self.subtensor.set_weights(
-                wallet=self.wallet,
-                netuid=self.config.netuid,
-                uids=uint_uids,
-                weights=uint_weights,
-                wait_for_finalization=False,
-                wait_for_inclusion=False,
-                version_key=self.spec_version,
-            )
-            if result is True:
-                bt.logging.info("set_weights on chain successfully!")
-                break
-            else:
-                bt.logging.error("set_weights failed. Retrying... ", msg)
+        # Hand the weights over to the background submitter, which retries with backoff and skips weights that
+        # barely moved since they were last set.
+        block = self.block
+        self.last_weights_block = block
+        self.weight_submitter.submit(uint_uids, uint_weights, block)
 
     def resync_metagraph(self):
         """Resyncs the metagraph and updates the hotkeys and moving averages based on the new metagraph."""
         bt.logging.info("resync_metagraph()")
 
-        # Copies state of metagraph before syncing.
-        previous_metagraph = copy.deepcopy(self.metagraph)
+        start = time.perf_counter()
+        # Fingerprints of the state before syncing, rather than a copy of the whole metagraph.
+        previous = self.fingerprint or MetagraphFingerprint(self.hotkeys, self.metagraph.axons)
 
         # Sync the metagraph.
         self.metagraph.sync(subtensor=self.subtensor)
+        self.last_sync_block = int(self.metagraph.block)
+        # `metagraph.hotkeys` builds a new list on every access.
+        hotkeys = self.metagraph.hotkeys
+        self.fingerprint = MetagraphFingerprint(hotkeys, self.metagraph.axons)
 
         bt.logging.info(
             "Metagraph updated, re-syncing hotkeys, dendrite pool and moving averages"
         )
         # Zero out all hotkeys that have been replaced.
-        for uid, hotkey in enumerate(self.hotkeys):
-            if hotkey != self.metagraph.hotkeys[uid]:
-                self.scores[uid] = 0  # hotkey has been replaced
+        replaced = self.fingerprint.replaced_hotkeys(previous)
+        replaced = replaced[replaced < min(len(self.hotkeys), len(self.scores))]
+        self.scores[replaced] = 0
+        if replaced.size:
+            bt.logging.info(f"Reset the scores of {replaced.size} uids with a new hotkey")
+        changed_axons = self.fingerprint.changed_axons(previous)
+        if changed_axons.size:
+            bt.logging.info(f"Axon info changed for {changed_axons.size} uids")
 
         # Check to see if the metagraph has changed size.
         # If so, we need to add new hotkeys and moving averages.
-        if len(self.hotkeys) < len(self.metagraph.hotkeys) or len(self.scores) < len(self.metagraph.hotkeys):
+        if len(self.hotkeys) < len(hotkeys) or len(self.scores) < len(hotkeys):
             # Update the size of the moving average scores.
-            new_moving_average = np.zeros((self.metagraph.n))
+            new_moving_average = np.zeros(self.metagraph.n, dtype=self.scores.dtype)
             min_len = min(len(self.hotkeys), len(self.scores))
             new_moving_average[:min_len] = self.scores[:min_len]
             self.scores = new_moving_average
 
         # Update the hotkeys.
-        self.hotkeys = copy.deepcopy(self.metagraph.hotkeys)
-        
-        # Check if the metagraph axon info has changed.
-        if previous_metagraph.axons == self.metagraph.axons:
-            return
-        
-        # Get balances from the database
-        neurons: List[bt.NeuronInfo] = self.metagraph.neurons
-        balances = [
-            {
-                "block": self.block,
-                "miner_uid": neuron.uid,
-                "hotkey": neuron.hotkey,
-                "balance": neuron.total_stake,
-            } for neuron in neurons
-        ]
-
-        try:
-            with requests.post(
-                f"{self.validator_server_url}/protocol/broadcast/balances/miners",
-                json={"balances": balances}
-            ) as resp:
-                result = resp.json()
-                if result["success"]:
-                    bt.logging.info(f"Broadcasted balances: {len(balances)} balances")
-                else:
-                    bt.logging.error(f"Failed to broadcast balances")
-        except Exception as e:
-            bt.logging.error(f"Failed to broadcast balances: {e}")
-
-    def update_scores(self, rewards: np.ndarray, uids: List[int]):
-        """Performs exponential moving average on the scores based on the rewards received from the miners."""
+        self.hotkeys = hotkeys
 
-        # Check if rewards contains NaN values.
-        if np.isnan(rewards).any():
-            bt.logging.warning(f"NaN values detected in rewards: {rewards}")
-            # Replace any NaN values in rewards with 0.
-            rewards = np.nan_to_num(rewards, nan=0)
+        self.resync_seconds.observe(time.perf_counter() - start)
+        self.resync_changed_uids.inc(replaced.size)
 
-        # Ensure rewards is a numpy array.
-        rewards = np.asarray(rewards)
+        # Publish the balances that moved in the background, sync does not wait on the node container.
+        self.balance_publisher.submit(int(self.metagraph.block), hotkeys, self.metagraph.total_stake)
 
-        # Check if `uids` is already a numpy array and copy it to avoid the warning.
-        if isinstance(uids, np.ndarray):
-            uids_array = uids.copy()
-        else:
-            uids_array = np.array(uids)
+    def update_scores(
+        self, rewards: np.ndarray, uids: Union[np.ndarray, List[int]], partial: bool = False
+    ):
+        """Performs exponential moving average on the scores based on the rewards received from the miners.
 
-        # Handle edge case: If either rewards or uids_array is empty.
-        if rewards.size == 0 or uids_array.size == 0:
-            bt.logging.info(f"rewards: {rewards}, uids_array: {uids_array}")
-            bt.logging.warning(
-                "Either rewards or uids_array is empty. No updates will be performed."
-            )
+        Uids without a reward are treated as rewarded 0, unless `partial` is set, in which case only the scores of
+        `uids` move. Use `partial` when the rewards of one round are applied in several batches. Rewards may also be
+        stacked, one row per round over the same uids, to apply several rounds at once. The scores are updated in
+        place, see `ScoreUpdater`.
+        """
+        applied = self.score_updater.update(self.scores, rewards, uids, partial=partial)
+        if not applied:
             return
-
-        # Check if sizes of rewards and uids_array match.
-        if rewards.size != uids_array.size:
-            raise ValueError(
-                f"Shape mismatch: rewards array of shape {rewards.shape} "
-                f"cannot be broadcast to uids array of shape {uids_array.shape}"
+        bt.logging.info(f"Updated the moving average with the rewards of {applied} uids")
+
+        if log_enabled(logging.DEBUG):
+            # Only build the uid/score pairs when they are shown.
+            min_log_score = 0.00001
+            logged_uids = np.flatnonzero(self.scores >= min_log_score)
+            logged_scores = list(
+                zip(logged_uids.tolist(), np.round(self.scores[logged_uids], 2).tolist())
+            )
+            bt.logging.debug(
+                f"UID/Score pairs where score is >= {min_log_score} (rounded):\n{logged_scores}"
             )
-
-        # Compute forward pass rewards, assumes uids are mutually exclusive.
-        # shape: [ metagraph.n ]
-        scattered_rewards: np.ndarray = np.zeros_like(self.scores)
-
-        bt.logging.info(f"Scores: {len(self.scores)}")
-        bt.logging.info(f"Scattered rewards: {len(scattered_rewards)}")
-        bt.logging.info(f"Uids array: {len(uids_array)}")
-        bt.logging.info(f"Rewards: {len(rewards)}")
-        
-        bt.logging.info(f"Uids array:\n{uids_array}")
-
-        scattered_rewards[uids_array] = rewards
-        bt.logging.debug(f"Scattered rewards:\n{rewards}")
-
-        # Update scores with rewards produced by this step.
-        # shape: [ metagraph.n ]
-        alpha: float = self.config.neuron.moving_average_alpha
-        self.scores: np.ndarray = (
-            alpha * scattered_rewards + (1 - alpha) * self.scores
-        )
-        bt.logging.debug(f"Updated moving avg scores:\n{self.scores}")
-
-        # For every score that is above min_log_score, add the uid:score pair to a two dimensional list and log that list
-        min_log_score = 0.00001
-        logged_scores = [
-            (uid, round(float(score), 2))
-            for uid, score in enumerate(self.scores)
-            if score >= min_log_score
-        ]
-        bt.logging.info(f"UID/Score pairs where score is >= {min_log_score} (rounded):\n{logged_scores}")
 
     def save_state(self):
         """Saves the state of the validator to a file."""
@@ -4,14 +4,17 @@ import asyncio
 import random
 import bittensor as bt
 
-from typing import List
+from typing import List, Optional
+
+from bittensor.utils import u16_normalized_float
 
 
 class MockSubtensor(bt.MockSubtensor):
     def __init__(self, netuid, n=16, wallet=None, network="mock"):
         super().__init__(network=network)
 
-        if not self.subnet_exists(netuid):
+        # `subnet_exists` queries the substrate interface, which the mock does not back with its chain state.
+        if netuid not in self.chain_state["SubtensorModule"]["NetworksAdded"]:
             self.create_subnet(netuid)
 
         # Register ourself (the validator) as a neuron at uid=0
@@ -34,6 +37,29 @@ class MockSubtensor(bt.MockSubtensor):
                 stake=100000,
             )
 
+    def _subnet_state(self, name: str, netuid: int, block: Optional[int] = None):
+        # The hyperparameter getters of bt.subtensor query the substrate interface, which the mock does not back with
+        # its chain state. The getters below read the chain state instead.
+        return self._get_most_recent_storage(
+            self.chain_state["SubtensorModule"][name][netuid], block
+        )
+
+    def subnetwork_n(self, netuid: int, block: Optional[int] = None) -> int:
+        return self._subnet_state("SubnetworkN", netuid, block)
+
+    def min_allowed_weights(self, netuid: int, block: Optional[int] = None) -> int:
+        return self._subnet_state("MinAllowedWeights", netuid, block)
+
+    def max_weight_limit(self, netuid: int, block: Optional[int] = None) -> float:
+        return u16_normalized_float(self._subnet_state("MaxWeightLimit", netuid, block))
+
+    def tempo(self, netuid: int, block: Optional[int] = None) -> int:
+        return self._subnet_state("Tempo", netuid, block)
+
+    def get_subnet_hyperparameters(self, netuid: int, block: Optional[int] = None):
+        # Not backed by the chain state, callers fall back to the single getters.
+        return None
+
 
 class MockMetagraph(bt.metagraph):
     def __init__(self, netuid=1, network="mock", subtensor=None):
@@ -1,3 +1,10 @@
 from . import config
 from . import misc
 from . import uids
+from . import http
+from . import broadcast
+from . import singleflight
+from . import admission
+from . import metrics
+from . import epoch
+from . import runtime
@@ -0,0 +1,125 @@
+import time
+import bisect
+import asyncio
+import itertools
+
+from typing import List, Tuple
+
+from bittensor.core.errors import PriorityException
+
+
+class AdmissionRejected(PriorityException):
+    """Raised when a request is shed by admission control. The axon answers it with a 503."""
+
+
+class AdmissionController:
+    """
+    Bounds how many requests run at once and orders the ones waiting for a slot by priority.
+
+    At most `max_concurrency` requests are admitted at a time, the rest queue ordered by priority (highest first,
+    then arrival). A request is rejected straight away when the queue is full and it does not outrank anyone in it,
+    otherwise the lowest priority waiter is shed to make room. Waiters that do not get a slot within `max_wait`
+    seconds are rejected too, so callers get a fast answer instead of a timeout when the upstream slows down.
+
+    Only use an instance from a single event loop.
+
+    Args:
+        max_concurrency (int): Number of requests allowed to run at the same time.
+        max_queue (int): Number of requests allowed to wait for a slot.
+        max_wait (float): Seconds a request may wait for a slot before it is rejected.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, max_wait: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.active = 0
+        # Sorted by (-priority, arrival), so the best waiter is first and the one to shed is last.
+        self._waiters: List[Tuple[float, int, asyncio.Future]] = []
+        self._arrivals = itertools.count()
+        self.admitted = 0
+        self.rejected = 0
+        self.shed = 0
+        self.timed_out = 0
+
+    async def acquire(self, priority: float) -> float:
+        """
+        Waits for a slot.
+
+        Args:
+            priority (float): Priority of the request, higher is served first.
+
+        Returns:
+            float: Seconds spent waiting in the queue.
+
+        Raises:
+            AdmissionRejected: If the queue is full or the request waited longer than `max_wait`.
+        """
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return 0.0
+
+        entry = (-priority, next(self._arrivals), asyncio.get_running_loop().create_future())
+        if len(self._waiters) >= self.max_queue:
+            if not self._waiters or entry >= self._waiters[-1]:
+                self.rejected += 1
+                raise AdmissionRejected(
+                    f"Miner overloaded: {len(self._waiters)} requests queued"
+                )
+            # Shed the lowest priority waiter to make room.
+            _, _, lowest = self._waiters.pop()
+            self.shed += 1
+            lowest.set_exception(
+                AdmissionRejected("Miner overloaded: shed for a higher priority request")
+            )
+        bisect.insort(self._waiters, entry)
+
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(entry[2], timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            self._discard(entry)
+            self.timed_out += 1
+            raise AdmissionRejected(
+                f"Miner overloaded: no slot within {self.max_wait}s"
+            )
+        except BaseException:
+            # Shed, or the caller went away. Hand the slot on if we were given one meanwhile.
+            if not self._discard(entry) and entry[2].done() and not entry[2].cancelled() and entry[2].exception() is None:
+                self.release()
+            raise
+        self.admitted += 1
+        return time.monotonic() - start
+
+    def release(self):
+        """
+        Frees a slot, handing it straight to the best waiter if there is one.
+        """
+        while self._waiters:
+            _, _, future = self._waiters.pop(0)
+            if not future.done():
+                # The slot moves to the waiter, so the active count stays the same.
+                future.set_result(True)
+                return
+        self.active -= 1
+
+    def _discard(self, entry) -> bool:
+        try:
+            self._waiters.remove(entry)
+            return True
+        except ValueError:
+            return False
+
+    def stats(self) -> dict:
+        """
+        Returns the current load and the admission counters.
+        """
+        return {
+            "active": self.active,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "shed": self.shed,
+            "timed_out": self.timed_out,
+        }
@@ -0,0 +1,345 @@
+import json
+import time
+import asyncio
+import threading
+import numpy as np
+import bittensor as bt
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from sybil.base.consts import BURN_UID
+from sybil.utils.metrics import REGISTRY
+from sybil.utils.fingerprint import fingerprints
+
+BROADCAST_NEURONS_PATH = "/protocol/broadcast/neurons"
+BROADCAST_BALANCES_PATH = "/protocol/broadcast/balances/miners"
+
+# Fields that describe a neuron, in row order. The block stamp is added when encoding, so an unchanged neuron
+# hashes the same every block.
+NEURON_FIELDS = (
+    "uid",
+    "ip",
+    "validator_trust",
+    "trust",
+    "alpha_stake",
+    "stake_weight",
+    "hotkey",
+    "coldkey",
+    "excluded",
+)
+
+
+def neuron_rows(metagraph: "bt.metagraph") -> List[Tuple]:
+    """
+    Reads the neuron fields from the metagraph's column arrays in bulk.
+
+    Args:
+        metagraph (bt.metagraph): The synced metagraph to describe.
+
+    Returns:
+        List[Tuple]: One tuple of plain Python values per uid, ordered as `NEURON_FIELDS`.
+    """
+    uids = metagraph.uids.tolist()
+    return list(
+        zip(
+            uids,
+            [axon.ip for axon in metagraph.axons],
+            metagraph.validator_trust.tolist(),
+            metagraph.trust.tolist(),
+            metagraph.alpha_stake.tolist(),
+            metagraph.S.tolist(),
+            metagraph.hotkeys,
+            metagraph.coldkeys,
+            [uid == BURN_UID for uid in uids],
+        )
+    )
+
+
+def neuron_entries(rows: List[Tuple], block: int) -> List[Dict[str, Any]]:
+    """
+    Turns neuron rows into the block-stamped entries the node container expects.
+    """
+    return [{**dict(zip(NEURON_FIELDS, row)), "block": block} for row in rows]
+
+
+def neuron_snapshot(metagraph: "bt.metagraph") -> List[Dict[str, Any]]:
+    """
+    Builds the list of neuron entries broadcast to the node container.
+
+    Args:
+        metagraph (bt.metagraph): The synced metagraph to describe.
+
+    Returns:
+        List[Dict[str, Any]]: One entry per uid, stamped with the metagraph block.
+    """
+    return neuron_entries(neuron_rows(metagraph), int(metagraph.block))
+
+
+def dumps(payload: Any) -> bytes:
+    """
+    Encodes a payload to compact JSON in one pass, using orjson when it is installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+class NeuronBroadcaster:
+    """
+    Sends neuron snapshots to the node container, only sending what changed since the last acknowledged broadcast.
+
+    Each broadcast is stamped with the metagraph block as its version. When the snapshot hashes the same as the last
+    acknowledged one the POST is skipped. Otherwise, in delta mode, only the uids whose entries changed are sent along
+    with the version they apply to. If the container reports a version mismatch, e.g. after a restart, the full
+    snapshot is sent instead. A full snapshot is also sent every `full_interval` seconds as a safety net.
+
+    Args:
+        mode (str): `delta` to skip unchanged snapshots and send changes only, `full` to always send everything.
+        full_interval (float): Maximum number of seconds between two full broadcasts.
+    """
+
+    def __init__(self, mode: str = "delta", full_interval: float = 600):
+        self.mode = mode
+        self.full_interval = full_interval
+        self.version = None
+        self.snapshot_hash = None
+        self.uid_hashes: Dict[int, int] = {}
+        self.last_full = 0.0
+        self.skipped = 0
+        self.deltas = 0
+        self.fulls = 0
+
+    async def broadcast(
+        self,
+        metagraph: "bt.metagraph",
+        post_json: Callable[[str, Any], Awaitable[Any]],
+    ) -> bool:
+        """
+        Broadcasts the neurons of the metagraph if they changed.
+
+        Args:
+            metagraph (bt.metagraph): The synced metagraph to broadcast.
+            post_json (Callable): Coroutine function posting an encoded JSON body to a path on the container and
+                returning the decoded response.
+
+        Returns:
+            bool: True if the container holds the current snapshot after this call.
+        """
+        rows = neuron_rows(metagraph)
+        version = int(metagraph.block)
+        uid_hashes = {row[0]: hash(row) for row in rows}
+        snapshot_hash = hash(tuple(uid_hashes.values()))
+
+        full_due = time.time() - self.last_full > self.full_interval
+        if self.mode == "delta" and snapshot_hash == self.snapshot_hash and not full_due:
+            self.skipped += 1
+            bt.logging.debug(
+                f"Neurons unchanged since version {self.version}, skipping broadcast"
+            )
+            return True
+
+        # Uids that disappeared cannot be expressed as a delta.
+        shrunk = not self.uid_hashes.keys() <= uid_hashes.keys()
+
+        if self.mode == "delta" and self.version is not None and not full_due and not shrunk:
+            changed = [row for row in rows if self.uid_hashes.get(row[0]) != uid_hashes[row[0]]]
+            bt.logging.info(
+                f"Submitting neurons delta: {len(changed)} of {len(rows)} neurons"
+            )
+            result = await post_json(
+                BROADCAST_NEURONS_PATH,
+                dumps({
+                    "neurons": neuron_entries(changed, version),
+                    "delta": True,
+                    "base_version": self.version,
+                    "version": version,
+                }),
+            )
+            if result.get("success"):
+                self.deltas += 1
+                self._acknowledge(version, snapshot_hash, uid_hashes)
+                bt.logging.info(f"Broadcasted neurons delta: {len(changed)} neurons")
+                return True
+            if not result.get("version_mismatch"):
+                bt.logging.error(f"Failed to broadcast neurons delta: {result}")
+                return False
+            bt.logging.info(
+                f"Neurons version mismatch (sent {self.version}, known {result.get('version')}), resending all neurons"
+            )
+
+        bt.logging.info(f"Submitting neurons info: {len(rows)} neurons")
+        result = await post_json(
+            BROADCAST_NEURONS_PATH,
+            dumps({"neurons": neuron_entries(rows, version), "version": version}),
+        )
+        if result.get("success"):
+            self.fulls += 1
+            self.last_full = time.time()
+            self._acknowledge(version, snapshot_hash, uid_hashes)
+            bt.logging.info(f"Broadcasted neurons info: {len(rows)} neurons")
+            return True
+
+        bt.logging.error(f"Failed to broadcast neurons info")
+        return False
+
+    def _acknowledge(self, version: int, snapshot_hash: int, uid_hashes: Dict[int, int]):
+        self.version = version
+        self.snapshot_hash = snapshot_hash
+        self.uid_hashes = uid_hashes
+
+
+class BalancePublisher:
+    """
+    Publishes miner balances to the node container in the background, only sending what changed.
+
+    `submit` hands over the stakes of every uid and returns straight away. Publishing runs on an event loop of its
+    own, a worker waits `coalesce` seconds so a burst of submissions is sent once, then posts the uids whose hotkey
+    changed or whose stake moved by more than `threshold` since the last acknowledged push. Failed pushes are retried
+    with exponential backoff, and a newer submission replaces the one being retried; as deltas are taken against
+    the acknowledged state, nothing is lost when it does.
+
+    Args:
+        post_json (Callable): Coroutine function posting a JSON body to a path on the container and returning the
+            decoded response.
+        schedule (Callable): Schedules a coroutine on the event loop publishing runs on, from any thread.
+        threshold (float): Stake change, in TAO, below which a uid is not sent again.
+        coalesce (float): Seconds to wait for further submissions before publishing.
+        retries (int): Number of times a failed push is retried.
+        backoff (float): Delay in seconds of the first retry, doubled for every further one.
+    """
+
+    def __init__(
+        self,
+        post_json: Callable[[str, Any], Awaitable[Any]],
+        schedule: Callable[[Awaitable[Any]], Any],
+        threshold: float = 1.0,
+        coalesce: float = 2.0,
+        retries: int = 3,
+        backoff: float = 1.0,
+    ):
+        self.post_json = post_json
+        self.schedule = schedule
+        self.threshold = threshold
+        self.coalesce = coalesce
+        self.retries = retries
+        self.backoff = backoff
+        # Hotkey fingerprints and stakes as last acknowledged by the container, by uid.
+        self.acked_hotkeys = np.empty(0, dtype=np.int64)
+        self.acked_stakes = np.empty(0, dtype=np.float64)
+        self.pushes = 0
+        self.failures = 0
+        self.coalesced = 0
+        self._pending: Optional[Tuple[int, List[str], np.ndarray]] = None
+        self._running = False
+        self._lock = threading.Lock()
+        self.published = REGISTRY.counter(
+            "balance_publisher_uids_total", "Miner balances sent to the node container."
+        )
+        self.failed = REGISTRY.counter(
+            "balance_publisher_failures_total", "Failed pushes of miner balances."
+        )
+
+    def submit(self, block: int, hotkeys: List[str], stakes: np.ndarray):
+        """
+        Queues the balances of every uid for publishing, replacing any submission not published yet.
+
+        Args:
+            block (int): The block the balances were read at.
+            hotkeys (List[str]): The hotkey of every uid.
+            stakes (np.ndarray): The total stake of every uid, in TAO.
+        """
+        with self._lock:
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = (block, hotkeys, np.asarray(stakes, dtype=np.float64))
+            if self._running:
+                return
+            self._running = True
+        self.schedule(self._drain())
+
+    def changed(self, hotkeys: List[str], stakes: np.ndarray) -> np.ndarray:
+        """
+        Returns the uids whose hotkey or stake changed since the last acknowledged push.
+        """
+        common = min(len(hotkeys), self.acked_hotkeys.size)
+        changed = np.ones(len(hotkeys), dtype=bool)
+        changed[:common] = (
+            fingerprints(hotkeys[:common], common) != self.acked_hotkeys[:common]
+        ) | (np.abs(stakes[:common] - self.acked_stakes[:common]) > self.threshold)
+        return np.flatnonzero(changed)
+
+    def _acknowledge(self, uids: np.ndarray, hotkeys: List[str], stakes: np.ndarray):
+        size = len(hotkeys)
+        if self.acked_hotkeys.size < size:
+            self.acked_hotkeys = np.resize(self.acked_hotkeys, size)
+            self.acked_stakes = np.resize(self.acked_stakes, size)
+        self.acked_hotkeys[uids] = fingerprints((hotkeys[uid] for uid in uids.tolist()), uids.size)
+        self.acked_stakes[uids] = stakes[uids]
+
+    async def _drain(self):
+        try:
+            attempt = 0
+            await asyncio.sleep(self.coalesce)
+            while True:
+                with self._lock:
+                    snapshot, self._pending = self._pending, None
+                if snapshot is None:
+                    return
+                if await self._push(*snapshot):
+                    attempt = 0
+                    continue
+
+                attempt += 1
+                with self._lock:
+                    # A newer submission supersedes the failed one, the delta is taken against the acknowledged state.
+                    if self._pending is None and attempt <= self.retries:
+                        self._pending = snapshot
+                if attempt > self.retries:
+                    bt.logging.error(f"Giving up on publishing balances after {attempt} attempts")
+                    attempt = 0
+                    continue
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+        finally:
+            with self._lock:
+                self._running = self._pending is not None
+            if self._running:
+                self.schedule(self._drain())
+
+    async def _push(self, block: int, hotkeys: List[str], stakes: np.ndarray) -> bool:
+        uids = self.changed(hotkeys, stakes)
+        if uids.size == 0:
+            bt.logging.debug("Balances unchanged since the last push, skipping")
+            return True
+
+        balances = [
+            {"block": block, "miner_uid": uid, "hotkey": hotkeys[uid], "balance": stake}
+            for uid, stake in zip(uids.tolist(), stakes[uids].tolist())
+        ]
+        try:
+            result = await self.post_json(BROADCAST_BALANCES_PATH, dumps({"balances": balances}))
+            success = isinstance(result, dict) and bool(result.get("success"))
+        except Exception as e:
+            bt.logging.error(f"Failed to broadcast balances: {e}")
+            success = False
+
+        if not success:
+            self.failures += 1
+            self.failed.inc()
+            return False
+        self._acknowledge(uids, hotkeys, stakes)
+        self.pushes += 1
+        self.published.inc(len(balances))
+        bt.logging.info(f"Broadcasted balances: {len(balances)} balances")
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "pushes": self.pushes,
+            "failures": self.failures,
+            "coalesced": self.coalesced,
+        }
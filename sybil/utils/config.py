@@ -88,6 +88,28 @@ def add_args(cls, parser):
         default=360,
     )
 
+    parser.add_argument(
+        "--neuron.block_time",
+        type=float,
+        help="Expected seconds between two blocks, used to predict when the next epoch starts.",
+        default=12.0,
+    )
+
+    parser.add_argument(
+        "--neuron.broadcast_mode",
+        type=str,
+        choices=["delta", "full"],
+        help="Whether neuron broadcasts send only what changed since the last broadcast, or everything every time.",
+        default="delta",
+    )
+
+    parser.add_argument(
+        "--neuron.metrics_port",
+        type=int,
+        help="Local port to serve Prometheus metrics on. Set to 0 to disable.",
+        default=0,
+    )
+
     parser.add_argument(
         "--mock",
         action="store_true",
@@ -176,6 +198,76 @@ def add_miner_args(cls, parser):
         default="http://127.0.0.1:3000",
     )
 
+    parser.add_argument(
+        "--miner.http.limit",
+        type=int,
+        help="Maximum number of pooled connections to the miner server.",
+        default=100,
+    )
+
+    parser.add_argument(
+        "--miner.http.timeout",
+        type=float,
+        help="Deadline in seconds for a single request to the miner server.",
+        default=10.0,
+    )
+
+    parser.add_argument(
+        "--miner.http.connect_timeout",
+        type=float,
+        help="Deadline in seconds for opening a connection to the miner server.",
+        default=3.0,
+    )
+
+    parser.add_argument(
+        "--miner.http.keepalive_timeout",
+        type=float,
+        help="Seconds an idle connection to the miner server is kept open.",
+        default=30.0,
+    )
+
+    parser.add_argument(
+        "--miner.http.warmup_connections",
+        type=int,
+        help="Number of connections to the miner server to open when the axon starts. Set to 0 to disable.",
+        default=4,
+    )
+
+    parser.add_argument(
+        "--miner.challenge_cache_ttl",
+        type=float,
+        help="Seconds a solved challenge is served from cache to repeated requests. Set to 0 to only coalesce concurrent requests.",
+        default=10.0,
+    )
+
+    parser.add_argument(
+        "--miner.max_concurrent_forwards",
+        type=int,
+        help="Maximum number of forwards that run against the miner server at the same time.",
+        default=32,
+    )
+
+    parser.add_argument(
+        "--miner.max_queue_depth",
+        type=int,
+        help="Maximum number of forwards waiting for a slot, lowest stake callers are rejected first beyond this.",
+        default=128,
+    )
+
+    parser.add_argument(
+        "--miner.max_queue_wait",
+        type=float,
+        help="Seconds a forward may wait for a slot before it is rejected.",
+        default=5.0,
+    )
+
+    parser.add_argument(
+        "--miner.subscribe_blocks",
+        action="store_true",
+        help="If set, the block an epoch starts at is awaited through a new head subscription instead of a timed sleep.",
+        default=False,
+    )
+
 
 def add_validator_args(cls, parser):
     """Add validator specific arguments to the parser."""
@@ -201,6 +293,13 @@ def add_validator_args(cls, parser):
         default=1,
     )
 
+    parser.add_argument(
+        "--neuron.step_interval",
+        type=float,
+        help="Target seconds between the start of two forward steps.",
+        default=10.0,
+    )
+
     parser.add_argument(
         "--neuron.sample_size",
         type=int,
@@ -208,6 +307,48 @@ def add_validator_args(cls, parser):
         default=50,
     )
 
+    parser.add_argument(
+        "--neuron.challenge_rounds",
+        action="store_true",
+        help="If set, each forward sends challenges to its shard of the sampled miners and scores their responses.",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--neuron.challenge_batch_size",
+        type=int,
+        help="Number of miners to generate challenges for with a single request to the validator server.",
+        default=256,
+    )
+
+    parser.add_argument(
+        "--neuron.challenge_concurrency",
+        type=int,
+        help="Maximum number of challenge generation requests in flight at once.",
+        default=8,
+    )
+
+    parser.add_argument(
+        "--neuron.verify_timeout",
+        type=float,
+        help="Deadline in seconds for the validator server to verify a single challenge response.",
+        default=10.0,
+    )
+
+    parser.add_argument(
+        "--neuron.reward_batch_size",
+        type=int,
+        help="Number of scored challenge responses applied to the moving average at once.",
+        default=16,
+    )
+
+    parser.add_argument(
+        "--neuron.balance_threshold",
+        type=float,
+        help="Stake change in TAO below which a miner balance is not published to the validator server again.",
+        default=1.0,
+    )
+
     parser.add_argument(
         "--neuron.disable_set_weights",
         action="store_true",
@@ -215,6 +356,41 @@ def add_validator_args(cls, parser):
         default=False,
     )
 
+    parser.add_argument(
+        "--neuron.weight_submit_attempts",
+        type=int,
+        help="Attempts to set a weight vector on chain before giving up on it.",
+        default=5,
+    )
+
+    parser.add_argument(
+        "--neuron.weight_submit_backoff",
+        type=float,
+        help="Base delay in seconds between two attempts to set weights, doubled after every failure.",
+        default=2.0,
+    )
+
+    parser.add_argument(
+        "--neuron.weight_l1_threshold",
+        type=float,
+        help="Total change of the quantized weights, in fractions of the largest weight, up to which setting weights is skipped.",
+        default=0.0,
+    )
+
+    parser.add_argument(
+        "--neuron.weight_linf_threshold",
+        type=float,
+        help="Change of any single quantized weight, in fractions of the largest weight, up to which setting weights is skipped.",
+        default=0.0,
+    )
+
+    parser.add_argument(
+        "--neuron.weight_refresh_blocks",
+        type=int,
+        help="Blocks after which weights are set again even if they did not change, so they do not go stale on chain.",
+        default=2000,
+    )
+
     parser.add_argument(
         "--neuron.moving_average_alpha",
         type=float,
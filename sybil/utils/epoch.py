@@ -0,0 +1,149 @@
+import time
+import threading
+import bittensor as bt
+
+from typing import Dict, Optional
+
+from sybil.utils.metrics import REGISTRY
+
+# Sync lateness in seconds, from "on the block" up to a few missed blocks.
+LATENESS_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 12.0, 24.0, 60.0)
+
+
+class EpochScheduler:
+    """
+    Sleeps until the next epoch boundary instead of polling the chain every second.
+
+    The boundary is `epoch_length` blocks after the later of the neuron's last update and the last epoch this
+    scheduler fired. The time it is reached is predicted from the last block number seen change and `block_time`,
+    and the scheduler sleeps until then, re-reading the block only when it wakes up. With `subscribe` set, the last
+    block before the boundary is awaited through a new head subscription, so the epoch fires as soon as the boundary
+    block is announced rather than on the next wake-up.
+
+    Every wake-up is counted and the delay between the boundary block's (estimated) arrival and the epoch firing is
+    recorded, both in the metrics registry and in `stats()`.
+
+    Args:
+        subtensor (bt.subtensor): Chain connection used to read the current block.
+        epoch_length (int): Number of blocks between two epochs.
+        block_time (float): Expected seconds between two blocks.
+        subscribe (bool): Await the boundary block through a new head subscription.
+        labels (Dict[str, str]): Labels of the recorded metrics.
+        min_sleep (float): Shortest sleep between two reads of the chain.
+    """
+
+    def __init__(
+        self,
+        subtensor: "bt.subtensor",
+        epoch_length: int,
+        block_time: float = 12.0,
+        subscribe: bool = False,
+        labels: Optional[Dict[str, str]] = None,
+        min_sleep: float = 1.0,
+    ):
+        self.subtensor = subtensor
+        self.epoch_length = epoch_length
+        self.block_time = block_time
+        self.subscribe = subscribe
+        self.min_sleep = min_sleep
+        self.last_epoch: Optional[int] = None
+        # Last block number seen and when it was first seen, the anchor boundary predictions are made from.
+        self.anchor_block: Optional[int] = None
+        self.anchor_time = 0.0
+        self.wakeups = 0
+        self.epochs = 0
+        self.last_lateness = 0.0
+        self._stop = threading.Event()
+        self.wakeup_counter = REGISTRY.counter(
+            "epoch_scheduler_wakeups_total",
+            "Times the epoch scheduler woke up to read the chain.",
+            labels,
+        )
+        self.lateness = REGISTRY.histogram(
+            "epoch_sync_lateness_seconds",
+            "Delay between an epoch boundary block and the epoch firing.",
+            labels,
+            buckets=LATENESS_BUCKETS,
+        )
+
+    def next_boundary(self, last_update: int) -> int:
+        """
+        Returns the block the next epoch starts at.
+        """
+        start = last_update if self.last_epoch is None else max(last_update, self.last_epoch)
+        return start + self.epoch_length
+
+    def wait(self, last_update: int) -> Optional[int]:
+        """
+        Blocks until the next epoch boundary is reached.
+
+        Args:
+            last_update (int): Block the neuron last updated at on chain.
+
+        Returns:
+            Optional[int]: The current block once the boundary is reached, None if the scheduler was stopped.
+        """
+        target = self.next_boundary(last_update)
+        # When the boundary block was expected while the chain was still short of it.
+        predicted: Optional[float] = None
+        while not self._stop.is_set():
+            block = self._observe()
+            if block >= target:
+                return self._fire(block, target, predicted)
+            predicted = self.predicted_time(target)
+
+            remaining = predicted - time.monotonic()
+            if self.subscribe and target - block <= 1:
+                try:
+                    self.subtensor.wait_for_block(target)
+                    continue
+                except Exception as e:
+                    bt.logging.warning(f"Block subscription failed, falling back to sleeping: {e}")
+                    self.subscribe = False
+            elif self.subscribe:
+                # Wake up a block early and await the boundary block itself through the subscription.
+                remaining -= self.block_time
+
+            self._stop.wait(max(remaining, self.min_sleep))
+        return None
+
+    def predicted_time(self, block: int) -> float:
+        """
+        Returns the monotonic time `block` is expected to be produced at.
+        """
+        return self.anchor_time + (block - self.anchor_block) * self.block_time
+
+    def stop(self):
+        """
+        Wakes up a pending `wait`, which then returns None.
+        """
+        self._stop.set()
+
+    def stats(self) -> dict:
+        return {
+            "epochs": self.epochs,
+            "wakeups": self.wakeups,
+            "last_epoch": self.last_epoch,
+            "last_lateness": round(self.last_lateness, 3),
+        }
+
+    def _observe(self) -> int:
+        block = int(self.subtensor.get_current_block())
+        self.wakeups += 1
+        self.wakeup_counter.inc()
+        if block != self.anchor_block:
+            self.anchor_block, self.anchor_time = block, time.monotonic()
+        return block
+
+    def _fire(self, block: int, target: int, predicted: Optional[float]) -> int:
+        now = time.monotonic()
+        # The current block arrived no later than when it was first seen, the boundary block `block - target` block
+        # times before that. If the boundary was expected earlier than that, the wake-up was late.
+        arrived = self.anchor_time - (block - target) * self.block_time
+        if predicted is not None:
+            arrived = min(arrived, predicted)
+        self.last_lateness = max(0.0, now - arrived)
+        self.lateness.observe(self.last_lateness)
+        self.last_epoch = block
+        self.epochs += 1
+        return block
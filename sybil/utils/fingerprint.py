@@ -0,0 +1,80 @@
+import numpy as np
+import bittensor as bt
+
+from typing import Hashable, Iterable, List, Optional
+
+
+def fingerprints(values: Iterable[Hashable], count: int) -> np.ndarray:
+    """
+    Hashes every value into one int64, so two lists can be compared with vectorized ops instead of element by
+    element. Hashes are only comparable within the process that computed them.
+
+    Args:
+        values (Iterable[Hashable]): The values to fingerprint.
+        count (int): The number of values.
+
+    Returns:
+        np.ndarray: One hash per value, in order.
+    """
+    return np.fromiter(map(hash, values), dtype=np.int64, count=count)
+
+
+def axon_key(axon: "bt.AxonInfo") -> tuple:
+    """
+    Returns the fields two axons are compared by.
+    """
+    return (
+        axon.version,
+        axon.ip,
+        axon.port,
+        axon.ip_type,
+        axon.hotkey,
+        axon.coldkey,
+        axon.protocol,
+    )
+
+
+def changed_uids(previous: np.ndarray, current: np.ndarray) -> np.ndarray:
+    """
+    Returns the uids whose fingerprint differs between two snapshots, including the uids only `current` has.
+    """
+    common = min(previous.size, current.size)
+    changed = np.flatnonzero(previous[:common] != current[:common])
+    if current.size > common:
+        changed = np.concatenate([changed, np.arange(common, current.size)])
+    return changed
+
+
+class MetagraphFingerprint:
+    """
+    Compact snapshot of the hotkeys and axons of a metagraph, 16 bytes per uid, to find what changed after a sync
+    without keeping a copy of the metagraph itself.
+
+    Args:
+        hotkeys (List[str]): The hotkey of every uid.
+        axons (List[bt.AxonInfo]): The axon of every uid.
+    """
+
+    def __init__(self, hotkeys: List[str], axons: List["bt.AxonInfo"]):
+        self.hotkeys = fingerprints(hotkeys, len(hotkeys))
+        self.axons = fingerprints(map(axon_key, axons), len(axons))
+
+    @classmethod
+    def of(cls, metagraph: "bt.metagraph") -> "MetagraphFingerprint":
+        return cls(metagraph.hotkeys, metagraph.axons)
+
+    def replaced_hotkeys(self, previous: Optional["MetagraphFingerprint"]) -> np.ndarray:
+        """
+        Returns the uids whose hotkey changed since `previous`, every uid if there is no previous snapshot.
+        """
+        if previous is None:
+            return np.arange(self.hotkeys.size)
+        return changed_uids(previous.hotkeys, self.hotkeys)
+
+    def changed_axons(self, previous: Optional["MetagraphFingerprint"]) -> np.ndarray:
+        """
+        Returns the uids whose axon changed since `previous`, every uid if there is no previous snapshot.
+        """
+        if previous is None:
+            return np.arange(self.axons.size)
+        return changed_uids(previous.axons, self.axons)
@@ -0,0 +1,469 @@
+import re
+import time
+import random
+import asyncio
+import aiohttp
+import concurrent.futures
+import threading
+import bittensor as bt
+
+from typing import Any, Callable, Coroutine, Dict, Mapping, NamedTuple, Optional, Tuple
+
+from sybil.utils.metrics import REGISTRY
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Path segments that identify a resource (challenge ids, solutions, hex keys) rather than an endpoint.
+_ID_SEGMENT = re.compile(r"/[0-9a-fA-F-]{16,}")
+
+
+def endpoint_of(path: str) -> str:
+    """
+    Returns the endpoint a request path belongs to, without query string and with ids collapsed, e.g.
+    `/protocol/challenge/<uuid>/<uuid>` becomes `/protocol/challenge/:id/:id`.
+    """
+    return _ID_SEGMENT.sub("/:id", path.split("?", 1)[0]) or "/"
+
+
+class Response(NamedTuple):
+    """The outcome of a request: status code, decoded body, and headers of the response."""
+
+    status: int
+    body: Any
+    headers: Mapping[str, str]
+
+
+class CircuitOpen(Exception):
+    """Raised instead of sending a request while the circuit to the server is open."""
+
+
+class CircuitBreaker:
+    """
+    Fails requests fast while a server is down.
+
+    After `failure_threshold` consecutive failures the circuit opens and requests are refused without being sent.
+    Once `reset_timeout` seconds have passed a single probe request is let through: if it succeeds the circuit
+    closes again, if it fails the circuit stays open for another `reset_timeout`.
+
+    Args:
+        failure_threshold (int): Consecutive failures that open the circuit.
+        reset_timeout (float): Seconds the circuit stays open before a probe is let through.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        """
+        Returns whether a request may be sent now.
+        """
+        return self.admit()[0]
+
+    def admit(self) -> Tuple[bool, bool]:
+        """
+        Returns whether a request may be sent now, and whether it is the probe of a half-open circuit.
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return True, False
+            if self._probing or time.monotonic() - self.opened_at < self.reset_timeout:
+                return False, False
+            self._probing = True
+            return True, True
+
+    def release_probe(self):
+        """
+        Lets another probe through after the probe request ended without telling anything about the server, e.g.
+        because it was cancelled. Neither counts a failure nor restarts the reset timeout.
+        """
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    bt.logging.warning(
+                        f"Opening circuit after {self.failures} consecutive failures"
+                    )
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+
+class PooledClient:
+    """
+    A long-lived, keep-alive HTTP client bound to a single base url.
+
+    aiohttp sessions may only be used from the event loop that created them. The axon serves requests on its own
+    uvicorn loop while broadcasts run on the neuron's main loop, so the client keeps one session per event loop and
+    lazily creates it the first time that loop makes a request. All sessions share the same limits and timeouts.
+
+    Failed requests, i.e. connection errors, timeouts and 5xx answers, are retried up to `retries` times with full
+    jitter exponential backoff. With a `breaker`, requests fail fast with `CircuitOpen` while the server is down.
+    Every request is timed and every failure counted per endpoint in the metrics registry, labelled with `name`.
+
+    Args:
+        base_url (str): The url every request path is appended to.
+        limit (int): Maximum number of simultaneous connections per session.
+        timeout (float): Default total deadline in seconds for a single request.
+        connect_timeout (float): Deadline in seconds for establishing a new connection.
+        keepalive_timeout (float): Seconds an idle connection is kept in the pool.
+        retries (int): Number of times a failed request is retried.
+        backoff (float): Base delay in seconds of the first retry, doubled for every further one.
+        max_backoff (float): Upper bound of a single retry delay.
+        timeouts (Dict[str, float]): Deadlines overriding `timeout` for specific endpoints, see `endpoint_of`.
+        breaker (CircuitBreaker): Optional circuit breaker shared by every request of the client.
+        name (str): Label of the client in the metrics, defaults to the base url.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        limit: int = 100,
+        timeout: float = 10.0,
+        connect_timeout: float = 3.0,
+        keepalive_timeout: float = 30.0,
+        retries: int = 0,
+        backoff: float = 0.25,
+        max_backoff: float = 4.0,
+        timeouts: Optional[Dict[str, float]] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        name: Optional[str] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.limit = limit
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.keepalive_timeout = keepalive_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeouts = timeouts or {}
+        self.breaker = breaker
+        self.name = name or self.base_url
+        self._sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+        self._metrics: Dict[str, Tuple[Any, Any]] = {}
+
+    def _timeout(self, timeout: Optional[float] = None) -> aiohttp.ClientTimeout:
+        return aiohttp.ClientTimeout(
+            total=timeout if timeout is not None else self.timeout,
+            sock_connect=self.connect_timeout,
+        )
+
+    def session(self) -> aiohttp.ClientSession:
+        """
+        Returns the session owned by the running event loop, creating it if needed.
+        """
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            session = aiohttp.ClientSession(
+                connector=connector, timeout=self._timeout()
+            )
+            self._sessions[loop] = session
+        return session
+
+    def _endpoint_metrics(self, endpoint: str):
+        metrics = self._metrics.get(endpoint)
+        if metrics is None:
+            labels = {"client": self.name, "endpoint": endpoint}
+            metrics = self._metrics[endpoint] = (
+                REGISTRY.histogram(
+                    "http_client_request_seconds",
+                    "Duration of HTTP requests, including retries.",
+                    labels,
+                ),
+                REGISTRY.counter(
+                    "http_client_retries_total", "Retried HTTP request attempts.", labels
+                ),
+            )
+        return metrics
+
+    def _count_error(self, endpoint: str, reason: str):
+        REGISTRY.counter(
+            "http_client_errors_total",
+            "Failed HTTP request attempts, by reason.",
+            {"client": self.name, "endpoint": endpoint, "reason": reason},
+        ).inc()
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        payload: Any = None,
+        timeout: Optional[float] = None,
+        decode: bool = True,
+        headers: Optional[Dict[str, str]] = None,
+        endpoint: Optional[str] = None,
+    ) -> Response:
+        """
+        Sends a request to the base url, retrying failed attempts.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The path, and query string, appended to the base url.
+            payload (Any): Optional JSON body, either as an object or already encoded as bytes.
+            timeout (float): Deadline of a single attempt, defaults to the endpoint's or the client's.
+            decode (bool): Decode the response body as JSON. Otherwise the body is read and discarded.
+            headers (Dict[str, str]): Extra request headers, e.g. for conditional requests.
+            endpoint (str): The endpoint label of the request's metrics, derived from `path` if not given. Paths
+                with segments a caller does not control, e.g. a miner's response, must pass one to bound the
+                number of series.
+
+        Returns:
+            Response: The status code, decoded body and headers of the response. A 304 answer has no body.
+
+        Raises:
+            CircuitOpen: If the circuit breaker refuses the request.
+            Exception: The error of the last attempt if every attempt failed.
+        """
+        if endpoint is None:
+            endpoint = endpoint_of(path)
+        if timeout is None:
+            timeout = self.timeouts.get(endpoint, self.timeout)
+        if isinstance(payload, (bytes, bytearray)):
+            body = {"data": payload, "headers": {**JSON_HEADERS, **(headers or {})}}
+        elif payload is not None:
+            body = {"json": payload, "headers": headers}
+        else:
+            body = {"headers": headers}
+
+        latency, retried = self._endpoint_metrics(endpoint)
+        start = time.perf_counter()
+        try:
+            for attempt in range(self.retries + 1):
+                allowed, probe = self.breaker.admit() if self.breaker is not None else (True, False)
+                if not allowed:
+                    self._count_error(endpoint, "circuit_open")
+                    raise CircuitOpen(f"Circuit to {self.base_url} is open")
+                try:
+                    async with self.session().request(
+                        method, f"{self.base_url}{path}", timeout=self._timeout(timeout), **body
+                    ) as response:
+                        if response.status >= 500:
+                            response.raise_for_status()
+                        if response.status == 304:
+                            result = None
+                        elif decode:
+                            result = await response.json()
+                        else:
+                            result = await response.read()
+                    if self.breaker is not None:
+                        self.breaker.record_success()
+                    return Response(response.status, result, response.headers)
+                except aiohttp.ContentTypeError:
+                    # The server answered, just not with JSON, e.g. a 404 page. Retrying will not change that.
+                    self._count_error(endpoint, "content_type")
+                    if self.breaker is not None:
+                        self.breaker.record_success()
+                    raise
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    reason = "timeout" if isinstance(e, asyncio.TimeoutError) else type(e).__name__
+                    self._count_error(endpoint, reason)
+                    if self.breaker is not None:
+                        self.breaker.record_failure()
+                    if attempt == self.retries:
+                        raise
+                except Exception as e:
+                    # Anything else the server caused, e.g. an undecodable body, is a failure too. Recording it also
+                    # releases a probe the breaker let through, or the circuit would stay open for good.
+                    self._count_error(endpoint, type(e).__name__)
+                    if self.breaker is not None:
+                        self.breaker.record_failure()
+                    raise
+                except BaseException:
+                    # Cancelled by the caller, which says nothing about the server: only let another probe through.
+                    if probe:
+                        self.breaker.release_probe()
+                    raise
+                retried.inc()
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+                await asyncio.sleep(random.uniform(0, delay))
+        finally:
+            latency.observe(time.perf_counter() - start)
+
+    async def get_json(
+        self, path: str, timeout: Optional[float] = None, endpoint: Optional[str] = None
+    ) -> Any:
+        """
+        Performs a GET request against the base url and decodes the JSON body.
+        """
+        return (await self.request("GET", path, timeout=timeout, endpoint=endpoint)).body
+
+    async def get_json_if_changed(
+        self, path: str, etag: Optional[str] = None, timeout: Optional[float] = None
+    ) -> Response:
+        """
+        Performs a conditional GET request: if the server still holds the version tagged `etag`, it answers 304
+        without a body. The version of the answer is in the `ETag` header of the response.
+        """
+        headers = {"If-None-Match": etag} if etag else None
+        return await self.request("GET", path, timeout=timeout, headers=headers)
+
+    async def post_json(
+        self, path: str, payload: Any, timeout: Optional[float] = None
+    ) -> Any:
+        """
+        Performs a POST request with a JSON payload against the base url and decodes the JSON body.
+        The payload may also be an already encoded JSON body as bytes.
+        """
+        return (await self.request("POST", path, payload, timeout=timeout)).body
+
+    async def get_status(self, path: str = "/", timeout: Optional[float] = None) -> int:
+        """
+        Performs a GET request against the base url and returns the status code, e.g. for health checks.
+        """
+        return (await self.request("GET", path, timeout=timeout, decode=False)).status
+
+    async def warmup(self, connections: int = 1, path: str = "/"):
+        """
+        Opens `connections` pooled connections up front so the first requests do not pay for TCP setup.
+        Failures are logged and otherwise ignored, the pool simply fills up on demand instead.
+        """
+
+        async def ping():
+            async with self.session().get(
+                f"{self.base_url}{path}", timeout=self._timeout()
+            ) as response:
+                await response.read()
+
+        results = await asyncio.gather(
+            *[ping() for _ in range(max(1, connections))],
+            return_exceptions=True,
+        )
+        failed = [r for r in results if isinstance(r, Exception)]
+        if failed:
+            bt.logging.warning(
+                f"Warm-up of {self.base_url} failed for {len(failed)}/{len(results)} connections: {failed[0]}"
+            )
+        else:
+            bt.logging.info(
+                f"Warmed up {len(results)} connections to {self.base_url}"
+            )
+
+    async def close(self):
+        """
+        Closes the session owned by the running event loop.
+        """
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None and not session.closed:
+            await session.close()
+
+    def close_threadsafe(self, timeout: float = 5.0):
+        """
+        Closes every session from a thread that does not own their event loops, e.g. when the neuron is stopped.
+        """
+        for loop, session in list(self._sessions.items()):
+            self._sessions.pop(loop, None)
+            if session.closed or loop.is_closed():
+                continue
+            try:
+                if asyncio._get_running_loop() is loop:
+                    loop.create_task(session.close())
+                elif loop.is_running():
+                    asyncio.run_coroutine_threadsafe(
+                        session.close(), loop
+                    ).result(timeout)
+                else:
+                    loop.run_until_complete(session.close())
+            except Exception as e:
+                bt.logging.warning(
+                    f"Failed to close session to {self.base_url}: {e}"
+                )
+
+
+# Process wide clients, one per base url.
+_shared_clients: Dict[str, PooledClient] = {}
+
+
+def shared_client(
+    base_url: str, breaker_factory: Optional[Callable[[], CircuitBreaker]] = None, **kwargs
+) -> PooledClient:
+    """
+    Returns the process wide client for `base_url`, creating it with `kwargs` on first use.
+
+    A client holds state of its own, so its circuit breaker is made by `breaker_factory` only when the client is
+    created, and shared by every later caller.
+    """
+    key = base_url.rstrip("/")
+    client = _shared_clients.get(key)
+    if client is None:
+        if breaker_factory is not None:
+            kwargs["breaker"] = breaker_factory()
+        client = _shared_clients[key] = PooledClient(key, **kwargs)
+    return client
+
+
+# Deadlines of validator server endpoints that differ from the default.
+VALIDATOR_SERVER_TIMEOUTS = {
+    "/": 5.0,
+    "/protocol/broadcast/neurons": 30.0,
+    "/protocol/broadcast/balances/miners": 30.0,
+    "/protocol/challenge/new": 30.0,
+}
+
+
+def validator_server_client(base_url: str) -> PooledClient:
+    """
+    Returns the client every call to the local validator server goes through: pooled, retried with backoff, and
+    failing fast while the server is down.
+    """
+    return shared_client(
+        base_url,
+        timeout=10.0,
+        retries=2,
+        timeouts=VALIDATOR_SERVER_TIMEOUTS,
+        breaker_factory=lambda: CircuitBreaker(failure_threshold=5, reset_timeout=10.0),
+        name="validator_server",
+    )
+
+
+# Event loop serving requests made from synchronous code, so those reuse pooled connections too.
+_sync_loop: Optional[asyncio.AbstractEventLoop] = None
+_sync_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_sync_loop.run_forever, name="http-sync-loop", daemon=True
+            ).start()
+    return _sync_loop
+
+
+def run_background(coroutine: Coroutine) -> concurrent.futures.Future:
+    """
+    Schedules a client coroutine from synchronous code on the shared background event loop without waiting for it.
+    """
+    return asyncio.run_coroutine_threadsafe(coroutine, _background_loop())
+
+
+def run_sync(coroutine: Coroutine, timeout: Optional[float] = None) -> Any:
+    """
+    Runs a client coroutine from synchronous code on a shared background event loop and returns its result.
+    Must not be called from that loop itself.
+    """
+    return run_background(coroutine).result(timeout)
@@ -1,5 +1,6 @@
 import os
 import logging
+import bittensor as bt
 from logging.handlers import RotatingFileHandler
 
 EVENTS_LEVEL_NUM = 38
@@ -33,3 +34,11 @@ def setup_events_logger(full_path, events_retention_size):
     logger.addHandler(file_handler)
 
     return logger
+
+
+def log_enabled(level: int) -> bool:
+    """
+    Returns whether bittensor logging currently emits records of `level`, so costly messages are only built when
+    they are shown.
+    """
+    return bt.logging.get_level() <= level
@@ -0,0 +1,248 @@
+import time
+import bisect
+import threading
+import bittensor as bt
+
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond dict lookups up to upstream calls that hit their deadline.
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _format_labels(labels: Dict[str, str], extra: Dict[str, str] = None) -> str:
+    merged = {**labels, **(extra or {})}
+    if not merged:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in merged.items()) + "}"
+
+
+class Histogram:
+    """
+    A fixed-bucket histogram. Observing a value is a bisect and two additions under a lock, cheap enough to leave on
+    for every request. Quantiles are estimated by linear interpolation inside the bucket they fall in.
+
+    Args:
+        name (str): Metric name.
+        help (str): Description shown in the Prometheus output.
+        labels (Dict[str, str]): Constant labels identifying this series.
+        buckets (Sequence[float]): Sorted upper bounds of the buckets, an implicit +Inf bucket is added.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str = "",
+        labels: Optional[Dict[str, str]] = None,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        """
+        Observes the wall time spent inside the `with` block.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates the `q` quantile of the observed values, 0.0 if nothing was observed.
+        """
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+        if total == 0:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                # Values above the last bound are reported as the last bound.
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def render(self) -> List[str]:
+        with self._lock:
+            counts = list(self.counts)
+            total, value_sum = self.count, self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, {'le': le})} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labels)} {value_sum}")
+        lines.append(f"{self.name}_count{_format_labels(self.labels)} {total}")
+        return lines
+
+
+class Counter:
+    """
+    A monotonically increasing counter.
+    """
+
+    def __init__(
+        self, name: str, help: str = "", labels: Optional[Dict[str, str]] = None
+    ):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels)} {self.value}"]
+
+
+class Gauge:
+    """
+    A value that can go up and down.
+    """
+
+    def __init__(
+        self, name: str, help: str = "", labels: Optional[Dict[str, str]] = None
+    ):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels)} {self.value}"]
+
+
+class MetricsRegistry:
+    """
+    Holds the metrics of a neuron and renders them in the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], object] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def _get_or_create(self, cls, name, help, labels, **kwargs):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = cls(name, help, labels, **kwargs)
+                self._metrics[key] = metric
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help: str = "",
+        labels: Optional[Dict[str, str]] = None,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labels, buckets=buckets)
+
+    def counter(
+        self, name: str, help: str = "", labels: Optional[Dict[str, str]] = None
+    ) -> Counter:
+        return self._get_or_create(Counter, name, help, labels)
+
+    def gauge(
+        self, name: str, help: str = "", labels: Optional[Dict[str, str]] = None
+    ) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labels)
+
+    def render(self) -> str:
+        """
+        Renders every metric, histograms are followed by a `<name>_quantile` gauge with their p50, p95 and p99.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        families: Dict[str, List[object]] = {}
+        for metric in metrics:
+            families.setdefault(metric.name, []).append(metric)
+
+        lines = []
+        for name, series in families.items():
+            kind = {Histogram: "histogram", Counter: "counter", Gauge: "gauge"}[type(series[0])]
+            lines.append(f"# HELP {name} {series[0].help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for metric in series:
+                lines.extend(metric.render())
+            if kind == "histogram":
+                lines.append(f"# HELP {name}_quantile Estimated quantiles of {name}")
+                lines.append(f"# TYPE {name}_quantile gauge")
+                for metric in series:
+                    for q in QUANTILES:
+                        labels = _format_labels(metric.labels, {"quantile": str(q)})
+                        lines.append(f"{name}_quantile{labels} {metric.quantile(q)}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1"):
+        """
+        Serves the rendered metrics at http://host:port/metrics from a daemon thread.
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Scrapes are not worth a log line each.
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        bt.logging.info(f"Serving metrics on http://{host}:{port}/metrics")
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+# Process wide registry every component records into.
+REGISTRY = MetricsRegistry()
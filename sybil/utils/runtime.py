@@ -0,0 +1,193 @@
+import time
+import signal
+import random
+import asyncio
+import inspect
+import bittensor as bt
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class SupervisedTask:
+    """
+    Book-keeping of one task run by a `Runtime`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[], Awaitable[Any]],
+        interval: float,
+        jitter: float = 0.0,
+        timeout: Optional[float] = None,
+        periodic: bool = True,
+    ):
+        self.name = name
+        self.fn = fn
+        self.periodic = periodic
+        self.interval = interval
+        self.jitter = jitter
+        self.timeout = timeout
+        self.runs = 0
+        self.failures = 0
+        self.last_duration = 0.0
+        self.task: Optional[asyncio.Task] = None
+
+    def next_delay(self) -> float:
+        """
+        Returns the interval spread by up to `jitter` either way, so tasks sharing an interval do not fire together.
+        """
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_duration": round(self.last_duration, 3),
+        }
+
+
+class Runtime:
+    """
+    Runs the periodic jobs of a neuron as supervised tasks on one event loop, with a single shutdown path.
+
+    Periodic tasks registered with `every` run once straight away and then every `interval` seconds, spread by a
+    random jitter. A failing run is logged and counted and the task carries on with its next run. Long-running
+    tasks registered with `spawn` are restarted after `restart_delay` seconds if they crash, and stop the runtime when
+    they return. `run` serves until `stop` is called, from any thread or by SIGINT/SIGTERM, then cancels every task
+    and runs the shutdown callbacks in reverse order of registration. Blocking callbacks are run in a worker thread.
+
+    Args:
+        jitter (float): Default fraction of the interval periodic runs are spread by.
+    """
+
+    def __init__(self, jitter: float = 0.1):
+        self.jitter = jitter
+        self.tasks: Dict[str, SupervisedTask] = {}
+        self._shutdown: List[Callable[[], Any]] = []
+        self._stop: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop_requested = False
+
+    def every(
+        self,
+        name: str,
+        interval: float,
+        fn: Callable[[], Awaitable[Any]],
+        jitter: Optional[float] = None,
+        timeout: Optional[float] = None,
+    ):
+        """
+        Registers a coroutine function to run every `interval` seconds, each run cancelled after `timeout` seconds.
+        """
+        self.tasks[name] = SupervisedTask(
+            name, fn, interval, self.jitter if jitter is None else jitter, timeout
+        )
+
+    def spawn(self, name: str, fn: Callable[[], Awaitable[Any]], restart_delay: float = 5.0):
+        """
+        Registers a long-running coroutine function, restarted `restart_delay` seconds after it crashes.
+        """
+        self.tasks[name] = SupervisedTask(name, fn, restart_delay, periodic=False)
+
+    def on_shutdown(self, fn: Callable[[], Any]):
+        """
+        Registers a callback, plain or coroutine function, to run once the tasks are cancelled.
+        """
+        self._shutdown.append(fn)
+
+    def stop(self):
+        """
+        Requests the runtime to shut down. Safe to call from any thread, and more than once.
+        """
+        self._stop_requested = True
+        if self._loop is None or self._loop.is_closed():
+            return
+        if asyncio._get_running_loop() is self._loop:
+            self._stop.set()
+        else:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    async def run(self):
+        """
+        Starts every registered task and serves until `stop` is called, then shuts down.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        if self._stop_requested:
+            self._stop.set()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self._loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                # Not the main thread, or not supported by the platform.
+                pass
+
+        for task in self.tasks.values():
+            runner = self._periodic if task.periodic else self._service
+            task.task = asyncio.create_task(runner(task), name=task.name)
+
+        try:
+            await self._stop.wait()
+        finally:
+            await self.shutdown()
+
+    async def _periodic(self, task: SupervisedTask):
+        while True:
+            start = time.monotonic()
+            try:
+                await asyncio.wait_for(task.fn(), timeout=task.timeout)
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                task.failures += 1
+                bt.logging.error(f"Task {task.name} timed out after {task.timeout}s")
+            except Exception as e:
+                task.failures += 1
+                bt.logging.error(f"Task {task.name} failed: {e}")
+            task.runs += 1
+            task.last_duration = time.monotonic() - start
+            await asyncio.sleep(task.next_delay())
+
+    async def _service(self, task: SupervisedTask):
+        while True:
+            start = time.monotonic()
+            try:
+                await task.fn()
+                bt.logging.info(f"Task {task.name} finished, stopping")
+                self.stop()
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                task.failures += 1
+                bt.logging.error(
+                    f"Task {task.name} crashed, restarting in {task.interval}s: {e}"
+                )
+            finally:
+                task.runs += 1
+                task.last_duration = time.monotonic() - start
+            await asyncio.sleep(task.interval)
+
+    async def shutdown(self):
+        """
+        Cancels every task and runs the shutdown callbacks. Failing callbacks do not prevent the others from running.
+        """
+        bt.logging.info("Shutting down")
+        tasks = [task.task for task in self.tasks.values() if task.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        for fn in reversed(self._shutdown):
+            try:
+                if inspect.iscoroutinefunction(fn):
+                    await fn()
+                else:
+                    await asyncio.to_thread(fn)
+            except Exception as e:
+                bt.logging.error(f"Shutdown callback {fn} failed: {e}")
+        self._shutdown.clear()
+
+    def stats(self) -> Dict[str, dict]:
+        return {name: task.stats() for name, task in self.tasks.items()}
@@ -0,0 +1,75 @@
+import time
+import asyncio
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one upstream call, and serves repeats from a short TTL cache.
+
+    The first caller for a key starts the call as its own task, every caller that arrives while it is in flight
+    awaits that same task. Successful results are kept for `ttl` seconds so retries are answered without a new
+    call, failures are never cached. The task is shielded, so a caller that gets cancelled (e.g. on a request
+    timeout) does not cancel the call for everyone else waiting on it.
+
+    Only use an instance from a single event loop.
+
+    Args:
+        ttl (float): Seconds a successful result is served from cache. Set to 0 to only coalesce in-flight calls.
+        maxsize (int): Maximum number of cached results, the oldest are evicted first.
+    """
+
+    def __init__(self, ttl: float = 10.0, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._cache: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Returns the result of `fn()` for `key`, sharing it with every other caller of the same key.
+        """
+        now = time.monotonic()
+        cached = self._cache.get(key)
+        if cached is not None:
+            expires_at, value = cached
+            if expires_at > now:
+                self.hits += 1
+                return value
+            del self._cache[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._settle(key, t))
+        return await asyncio.shield(task)
+
+    def _settle(self, key: Hashable, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if self.ttl <= 0 or task.cancelled() or task.exception() is not None:
+            return
+        self._cache[key] = (time.monotonic() + self.ttl, task.result())
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the hit, miss and coalesced call counters.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+            "cached": len(self._cache),
+        }
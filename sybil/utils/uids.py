@@ -25,3 +25,37 @@ def check_uid_availability(
     # # Available otherwise.
     # return True
     return True
+
+
+def get_random_uids(self, k: int, exclude: List[int] = None) -> np.ndarray:
+    """Returns k available random uids from the metagraph.
+    Args:
+        k (int): Number of uids to return.
+        exclude (List[int]): List of uids to exclude from the random sampling.
+    Returns:
+        uids (np.ndarray): Randomly sampled available uids.
+    Notes:
+        If `k` is larger than the number of available `uids`, all available uids are returned.
+    """
+    exclude = set(exclude or [])
+    avail_uids = [
+        uid
+        for uid in range(self.metagraph.n.item())
+        if uid not in exclude
+        and check_uid_availability(
+            self.metagraph, uid, self.config.neuron.vpermit_tao_limit
+        )
+    ]
+    k = min(k, len(avail_uids))
+    return np.array(random.sample(avail_uids, k), dtype=np.int64)
+
+
+def split_uids(uids: np.ndarray, shards: int) -> List[np.ndarray]:
+    """Splits uids into at most `shards` disjoint, evenly sized, non-empty shards.
+    Args:
+        uids (np.ndarray): The uids to split.
+        shards (int): The number of shards to split into.
+    Returns:
+        List[np.ndarray]: The shards, fewer than `shards` when there are fewer uids than shards.
+    """
+    return [shard for shard in np.array_split(uids, max(1, shards)) if shard.size]
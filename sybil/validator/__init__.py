@@ -1,2 +1,2 @@
-from .forward import forward
+from .forward import forward, score_mining_pools
 from .reward import reward
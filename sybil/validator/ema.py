@@ -0,0 +1,128 @@
+import math
+import numpy as np
+import bittensor as bt
+
+from typing import Dict, Sequence, Union
+
+
+def _in_bounds(uids: np.ndarray, size: int) -> bool:
+    # Negative uids wrap around to huge unsigned ones, so a single reduction checks both bounds.
+    if uids.dtype.kind == "i":
+        uids = uids.view(np.dtype(f"u{uids.itemsize}"))
+    elif uids.dtype.kind != "u":
+        return bool(uids.min() >= 0 and uids.max() < size)
+    return int(np.maximum.reduce(uids)) < size
+
+
+class ScoreUpdater:
+    """
+    Applies the exponential moving average of rewards to the scores in place.
+
+    Every update folds into the score array it is given without allocating arrays of the metagraph's size, only
+    temporaries the size of the rewarded batch. Uids are bound checked with two reductions, and out of range uids are
+    dropped with a warning rather than failing the whole batch.
+
+    Rewards may be stacked, one row per round over the same uids. The rounds are folded into a single update, through
+    scratch buffers kept between updates, that gives the same scores as applying them one after the other. NaN
+    rewards count as 0 in the round they occur in.
+
+    Args:
+        alpha (float): How much of a new reward goes into the moving average.
+    """
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self._buffers: Dict[str, np.ndarray] = {}
+        self._weights: Dict[int, np.ndarray] = {}
+
+    def _buffer(self, name: str, size: int, dtype: np.dtype) -> np.ndarray:
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.size < size or buffer.dtype != dtype:
+            # Grow to the next power of two so slowly growing batches do not reallocate every time.
+            capacity = 1 << max(size - 1, 0).bit_length()
+            buffer = self._buffers[name] = np.empty(capacity, dtype=dtype)
+        return buffer[:size]
+
+    def _round_weights(self, rounds: int) -> np.ndarray:
+        # Weight of round j out of `rounds` in the folded update: alpha * (1 - alpha) ** (rounds - 1 - j).
+        weights = self._weights.get(rounds)
+        if weights is None:
+            exponents = np.arange(rounds - 1, -1, -1)
+            weights = self._weights[rounds] = self.alpha * (1 - self.alpha) ** exponents
+        return weights
+
+    def update(
+        self,
+        scores: np.ndarray,
+        rewards: Union[np.ndarray, Sequence[float]],
+        uids: Union[np.ndarray, Sequence[int]],
+        partial: bool = False,
+    ) -> int:
+        """
+        Moves `scores` towards the rewards of `uids`, in place.
+
+        Args:
+            scores (np.ndarray): The moving average of every uid, updated in place.
+            rewards (np.ndarray): The rewards of `uids`, or one row of rewards per round when stacked.
+            uids (np.ndarray): The uids rewarded, mutually exclusive.
+            partial (bool): Only move the scores of `uids`. Otherwise every other uid is treated as rewarded 0.
+
+        Returns:
+            int: The number of uids rewarded.
+
+        Raises:
+            ValueError: If the rewards do not match the uids.
+        """
+        rewards = np.asarray(rewards)
+        uids = np.asarray(uids)
+        if rewards.ndim == 1:
+            rewards = rewards[np.newaxis]
+        if rewards.size == 0 or uids.size == 0:
+            bt.logging.warning(
+                "Either rewards or uids_array is empty. No updates will be performed."
+            )
+            return 0
+        if rewards.ndim != 2 or uids.ndim != 1 or rewards.shape[1] != uids.size:
+            raise ValueError(
+                f"Shape mismatch: rewards array of shape {rewards.shape} "
+                f"cannot be broadcast to uids array of shape {uids.shape}"
+            )
+
+        if not _in_bounds(uids, scores.size):
+            valid = (uids >= 0) & (uids < scores.size)
+            bt.logging.warning(
+                f"Dropping rewards of {int(uids.size - valid.sum())} uids outside of the {scores.size} scores"
+            )
+            uids, rewards = uids[valid], rewards[:, valid]
+            if uids.size == 0:
+                return 0
+
+        rounds, count = rewards.shape
+        if rounds == 1:
+            # A single round, the common case: temporaries the size of the batch cost less than the buffers do.
+            folded = self._sanitized(rewards[0]) * self.alpha
+        else:
+            folded = self._buffer("folded", count, scores.dtype)
+            scaled = self._buffer("scaled", count, scores.dtype)
+            folded.fill(0)
+            for weight, row in zip(self._round_weights(rounds), rewards):
+                np.multiply(self._sanitized(row), weight, out=scaled)
+                folded += scaled
+
+        decay = (1 - self.alpha) ** rounds
+        if partial:
+            scores[uids] = scores[uids] * decay + folded
+        else:
+            scores *= decay
+            # Uids are unique, so adding through the index adds every reward once.
+            scores[uids] += folded
+        return count
+
+    @staticmethod
+    def _sanitized(row: np.ndarray) -> np.ndarray:
+        # A sum is NaN as soon as one of its terms is, checking it avoids a mask the size of the row. Each round is
+        # sanitized on its own, so a NaN only drops the reward of its own round.
+        if math.isnan(np.add.reduce(row)):
+            bt.logging.warning(f"NaN values detected in rewards: {row}")
+            return np.where(np.isnan(row), 0, row)
+        return row
@@ -17,88 +17,104 @@
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 # DEALINGS IN THE SOFTWARE.
 
-import time
 import math
 import bittensor as bt
 import asyncio
-import aiohttp
 import numpy as np
 
-from sybil.validator.utils import generate_challenges
-from sybil.validator.reward import get_rewards
+from sybil.validator.utils import iter_challenges
+from sybil.validator.reward import stream_rewards
 from sybil.base.consts import BURN_UID, BURN_WEIGHT
+from sybil.utils.broadcast import NeuronBroadcaster
+from sybil.utils.http import validator_server_client
 
-async def forward(self):
+async def forward(self, miner_uids: np.ndarray):
     """
-    The forward function is called by the validator every time step.
+    The forward function is called by each of the concurrent forwards every time step, with its own shard of miners.
 
-    It is responsible for querying the network and scoring the responses.
+    It is responsible for querying the miners of the shard and scoring the responses. Challenge rounds only run
+    when enabled with `--neuron.challenge_rounds`, the mining pool scores are applied by `score_mining_pools` once
+    per step for every forward.
 
     Args:
         self (:obj:`bittensor.neuron.Neuron`): The neuron object which contains all the necessary state for the validator.
+        miner_uids (np.ndarray): The uids of the miners this forward is responsible for, disjoint from the other forwards.
 
     """
-    
-    # Post miner and validator info to the container    
-    await broadcast_neurons(self.metagraph, self.validator_server_url)
-    
-    try:
-        bt.logging.info(f"Getting mining pool scores from {self.validator_server_url}/validator/score/mining_pools")
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"{self.validator_server_url}/validator/score/mining_pools"
-            ) as resp:
-                result = await resp.json()
-                # Extract all UIDs from the response
-                # Assuming the response is a dict mapping mining_pool_uid to score info
-                if not isinstance(result, dict):
-                    bt.logging.error(f"Unexpected response format: {result}")
-                    all_uids = []
-                else:
-                    all_uids = [int(x) for x in result.keys()]
-                    bt.logging.info(f"Retrieved {len(all_uids)} UIDs from mining pool scores response")
-                    all_scores = [float(x['score']) for x in result.values()]
-                    # Update the scores in the metagraph
-                    self.update_scores(all_scores, all_uids)
-    except Exception as e:
-        bt.logging.error(f"Failed to broadcast neurons info: {e}")
+    if not self.config.neuron.challenge_rounds or len(miner_uids) == 0:
+        return
+
+    # Query each miner with its own challenge as soon as the challenge is ready.
+    challenges, queries = [], []
+    async for uid, challenge in iter_challenges(
+        miner_uids.tolist(),
+        self.validator_server_url,
+        batch_size=self.config.neuron.challenge_batch_size,
+        max_concurrency=self.config.neuron.challenge_concurrency,
+    ):
+        if challenge is None:
+            continue
+        challenges.append((uid, challenge))
+        queries.append(
+            asyncio.ensure_future(
+                self.dendrite.forward(
+                    axons=self.metagraph.axons[uid],
+                    synapse=challenge,
+                    timeout=self.config.neuron.timeout,
+                    deserialize=True,
+                )
+            )
+        )
+    if not challenges:
+        bt.logging.error(f"No challenges generated for miners {miner_uids.tolist()}, skipping round")
+        return
+
+    # Score responses as they come in, feeding them to the moving average in micro-batches.
+    scored = 0
+    async for uids, rewards in stream_rewards(
+        [uid for uid, _ in challenges],
+        [challenge.challenge for _, challenge in challenges],
+        queries,
+        self.validator_server_url,
+        timeout=self.config.neuron.verify_timeout,
+        batch_size=self.config.neuron.reward_batch_size,
+    ):
+        self.update_scores(rewards, uids, partial=True)
+        scored += len(uids)
+    bt.logging.info(f"Scored {scored} challenge responses for miners {miner_uids.tolist()}")
+
+
+async def score_mining_pools(self):
+    """
+    The shared part of a step, run once per step however many forwards run concurrently.
 
-    time.sleep(10)
+    Posts miner and validator info to the container while fetching the latest mining pool scores from it, then
+    updates the scores with them if they changed since the last step.
 
+    Args:
+        self (:obj:`bittensor.neuron.Neuron`): The neuron object which contains all the necessary state for the validator.
+
+    """
+    _, result = await asyncio.gather(
+        broadcast_neurons(self.metagraph, self.validator_server_url, self.broadcaster),
+        self.pool_scores.fetch(self.validator_server_url),
+    )
 
-async def broadcast_neurons(metagraph, server_url):
+    # Scores the server did not change since the last step were already applied.
+    if result is not None:
+        uids, scores = result
+        bt.logging.info(f"Retrieved {len(uids)} UIDs from mining pool scores response")
+        # Update the scores in the metagraph
+        self.update_scores(scores, uids)
+
+
+async def broadcast_neurons(metagraph, server_url, broadcaster: NeuronBroadcaster):
     """
     Broadcast the neurons to the server.
     """
     bt.logging.info(f"Broadcasting neurons to {server_url}/protocol/broadcast/neurons")
 
-    neurons_info = []
-    block = int(metagraph.block)
-    for neuron in metagraph.neurons:
-        uid = neuron.uid
-        neurons_info.append({
-            'uid': uid,
-            'ip': metagraph.axons[uid].ip,
-            'validator_trust': neuron.validator_trust,
-            'trust': neuron.trust,
-            "alpha_stake": float(metagraph.alpha_stake[uid].item()),
-            'stake_weight': float(metagraph.S[uid].item()),
-            'block': block,
-            'hotkey': neuron.hotkey,
-            'coldkey': neuron.coldkey,
-            'excluded': uid == BURN_UID,
-        })
-    bt.logging.info(f"Submitting neurons info: {len(neurons_info)} neurons")
-    try:     
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{server_url}/protocol/broadcast/neurons",
-                json={"neurons": neurons_info}
-            ) as resp:
-                result = await resp.json()
-                if result["success"]:
-                    bt.logging.info(f"Broadcasted neurons info: {len(neurons_info)} neurons")
-                else:
-                    bt.logging.error(f"Failed to broadcast neurons info")
+    try:
+        await broadcaster.broadcast(metagraph, validator_server_client(server_url).post_json)
     except Exception as e:
-        bt.logging.error(f"Failed to broadcast neurons info: {e}")
\ No newline at end of file
+        bt.logging.error(f"Failed to broadcast neurons info: {e}")
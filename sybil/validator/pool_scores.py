@@ -0,0 +1,97 @@
+import numpy as np
+import bittensor as bt
+
+from typing import Any, Dict, Optional, Tuple
+
+from sybil.utils.http import validator_server_client
+from sybil.utils.metrics import REGISTRY
+
+MINING_POOL_SCORES_PATH = "/validator/score/mining_pools"
+
+
+def parse_pool_scores(result: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Turns the mining pool scores answered by the validator server into uid and score arrays.
+
+    Args:
+        result (Dict[str, Any]): Mining pool uid to score info, as answered by the server.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The uids, as int64, and their scores, as float32, in the same order.
+    """
+    count = len(result)
+    uids = np.fromiter(map(int, result.keys()), dtype=np.int64, count=count)
+    scores = np.fromiter(
+        (float(pool["score"]) for pool in result.values()), dtype=np.float32, count=count
+    )
+    return uids, scores
+
+
+class PoolScoreFetcher:
+    """
+    Fetches the mining pool scores from the validator server only when they changed.
+
+    The server tags every version of the scores with an ETag. The fetcher sends the tag of the last scores it
+    applied along with each request, and the server answers 304 without a body as long as the scores did not change.
+    Unchanged scores are then neither parsed nor applied again, so a score only moves the moving average once per
+    scoring round of the server rather than once per validator step.
+
+    Fetches are counted by outcome in the metrics registry and in `stats()`.
+    """
+
+    def __init__(self):
+        self.etag: Optional[str] = None
+        self.counts = {"changed": 0, "unchanged": 0, "failed": 0}
+        self._counters = {
+            outcome: REGISTRY.counter(
+                "validator_pool_score_fetches_total",
+                "Fetches of the mining pool scores, by outcome.",
+                {"outcome": outcome},
+            )
+            for outcome in self.counts
+        }
+
+    def _count(self, outcome: str):
+        self.counts[outcome] += 1
+        self._counters[outcome].inc()
+
+    async def fetch(self, server_url: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Fetches the mining pool scores if they changed since the last fetch.
+
+        Args:
+            server_url (str): The url of the validator server.
+
+        Returns:
+            Optional[Tuple[np.ndarray, np.ndarray]]: The uids and scores, None if they did not change or could not
+            be fetched.
+        """
+        try:
+            response = await validator_server_client(server_url).get_json_if_changed(
+                MINING_POOL_SCORES_PATH, self.etag
+            )
+        except Exception as e:
+            self._count("failed")
+            bt.logging.error(f"Failed to get mining pool scores: {e}")
+            return None
+
+        if response.status == 304:
+            self._count("unchanged")
+            bt.logging.debug(f"Mining pool scores unchanged since version {self.etag}")
+            return None
+
+        try:
+            if response.status != 200 or not isinstance(response.body, dict):
+                raise ValueError(f"unexpected response {response.status}: {response.body}")
+            uids, scores = parse_pool_scores(response.body)
+        except (ValueError, TypeError, KeyError) as e:
+            self._count("failed")
+            bt.logging.error(f"Unexpected mining pool scores response: {e}")
+            return None
+
+        self._count("changed")
+        self.etag = response.headers.get("ETag")
+        return uids, scores
+
+    def stats(self) -> dict:
+        return {**self.counts, "version": self.etag}
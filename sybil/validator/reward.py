@@ -16,12 +16,18 @@
 # THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 # DEALINGS IN THE SOFTWARE.
+import time
 import numpy as np
-from typing import List
+from typing import AsyncIterator, Awaitable, List, Optional, Tuple
 import bittensor as bt
-import aiohttp
 import asyncio
 
+from sybil.utils.http import validator_server_client
+
+CHALLENGE_PATH = "/protocol/challenge"
+# Metrics label of response verifications, whose path holds the miner's response.
+VERIFY_ENDPOINT = f"{CHALLENGE_PATH}/:id/:response"
+
 def reward(query: int, response: int) -> float:
     """
     Reward the miner response to the dummy request. This method returns a reward
@@ -36,35 +42,110 @@ def reward(query: int, response: int) -> float:
     return 1.0 if response == query * 2 else 0
 
 
-async def get_rewards(challenges: List[str], responses: List[str], validator_server_url: str) -> List[float]:
+async def verify_response(
+    challenge: str,
+    response: Optional[str],
+    validator_server_url: str,
+    timeout: float = 10.0,
+) -> float:
+    """
+    Asks the validator server to verify one challenge response.
+
+    Returns:
+        float: The score of the response, 0 if there is no response or it could not be verified within `timeout`.
+    """
+    if response is None:
+        return 0.0
+    bt.logging.debug(f"Getting score at: {validator_server_url}{CHALLENGE_PATH}/{challenge}/{response}")
     try:
-        """
-        Get the scores for the responses.
-        """
-        async def fetch_score(challenge, response) -> float:
-            bt.logging.info(f"Getting score at: {validator_server_url}/challenge/{challenge}/{response}")
-            if response is None:
-                return 0
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{validator_server_url}/challenge/{challenge}/{response}"
-                ) as resp:
-                    result = await resp.json()
-                    if result["score"]:
-                        bt.logging.info(f"Score: {result['score']}")
-                    else:
-                        bt.logging.info(f"No score found in response: {result}")
-                    return result["score"] if "score" in result else 0
-                
-        # Concurrently fetch all scores
-        scores = await asyncio.gather(
-            *[fetch_score(challenge, response) for challenge, response in zip(challenges, responses)]
+        result = await validator_server_client(validator_server_url).get_json(
+            f"{CHALLENGE_PATH}/{challenge}/{response}", timeout=timeout, endpoint=VERIFY_ENDPOINT
         )
-        
-        # Convert None to 0
-        scores = [0 if score is None else score for score in scores]
-        
-        return scores
     except Exception as e:
-        print(f"Error getting rewards: {e}")
-        return None
+        bt.logging.warning(f"Failed to verify response to challenge {challenge}: {e}")
+        return 0.0
+    if not isinstance(result, dict):
+        return 0.0
+    # The server answers with a score, or with whether the response was correct.
+    score = result["score"] if "score" in result else float(bool(result.get("correct")))
+    return float(score or 0.0)
+
+
+async def stream_rewards(
+    uids: List[int],
+    challenges: List[str],
+    responses: List[Awaitable[Optional[str]]],
+    validator_server_url: str,
+    timeout: float = 10.0,
+    batch_size: int = 16,
+    flush_interval: float = 1.0,
+) -> AsyncIterator[Tuple[List[int], np.ndarray]]:
+    """
+    Scores responses as they come in and yields the scores in micro-batches.
+
+    Each response is verified as soon as it resolves, so one slow miner or verification does not hold up the others.
+    A response that fails to resolve or to verify within `timeout` seconds scores 0. Scores are yielded as `(uids,
+    rewards)` once `batch_size` of them are ready, or `flush_interval` seconds after the first one of a batch.
+
+    Args:
+        uids (List[int]): The uid each challenge was sent to.
+        challenges (List[str]): The challenge sent to each uid.
+        responses (List[Awaitable]): Awaitables resolving to each uid's response, e.g. pending dendrite queries.
+        validator_server_url (str): The url of the validator server.
+        timeout (float): Deadline in seconds for verifying a single response once it is in.
+        batch_size (int): Number of scores per micro-batch.
+        flush_interval (float): Longest a ready score waits for its batch to fill up.
+    """
+
+    async def score(uid, challenge, response) -> Tuple[int, float]:
+        try:
+            response = await response
+        except Exception as e:
+            bt.logging.warning(f"No response from miner uid {uid}: {e}")
+            return uid, 0.0
+        return uid, await verify_response(challenge, response, validator_server_url, timeout)
+
+    pending = {
+        asyncio.ensure_future(score(uid, challenge, response))
+        for uid, challenge, response in zip(uids, challenges, responses)
+    }
+    batch_uids, batch_rewards = [], []
+    deadline = None
+    try:
+        while pending:
+            wait_for = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, pending = await asyncio.wait(
+                pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                uid, reward = task.result()
+                batch_uids.append(uid)
+                batch_rewards.append(reward)
+            if batch_uids and deadline is None:
+                deadline = time.monotonic() + flush_interval
+            if len(batch_uids) >= batch_size or (batch_uids and time.monotonic() >= deadline):
+                yield batch_uids, np.asarray(batch_rewards, dtype=np.float32)
+                batch_uids, batch_rewards, deadline = [], [], None
+        if batch_uids:
+            yield batch_uids, np.asarray(batch_rewards, dtype=np.float32)
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def get_rewards(
+    challenges: List[str],
+    responses: List[Optional[str]],
+    validator_server_url: str,
+    timeout: float = 10.0,
+) -> List[float]:
+    """
+    Get the scores for the responses, in the order of the challenges. Responses that are missing or could not be
+    verified score 0.
+    """
+    return await asyncio.gather(
+        *[
+            verify_response(challenge, response, validator_server_url, timeout)
+            for challenge, response in zip(challenges, responses)
+        ]
+    )
@@ -0,0 +1,85 @@
+import time
+import asyncio
+import bittensor as bt
+
+from collections import deque
+from contextlib import asynccontextmanager
+
+from sybil.utils.metrics import REGISTRY
+
+
+class StepScheduler:
+    """
+    Paces validator steps to a fixed cadence without blocking the event loop.
+
+    A step runs inside `async with scheduler.step():`. Once the body is done, the scheduler awaits whatever is left
+    of `interval` since the step started, so a slow step is followed straight away by the next one and a fast step
+    leaves the loop free for the other forwards. Step duration, idle time and how much longer than asked the idle
+    sleep took (the event loop lag, non-zero when something blocks the loop) are recorded in the metrics registry.
+    Utilization is the share of the last `window` steps' wall time spent working.
+
+    Args:
+        interval (float): Target seconds between the start of two steps.
+        window (int): Number of recent steps utilization is computed over.
+    """
+
+    def __init__(self, interval: float, window: int = 20):
+        self.interval = interval
+        self.steps = 0
+        self._busy = deque(maxlen=window)
+        self._idle = deque(maxlen=window)
+        self.step_seconds = REGISTRY.histogram(
+            "validator_step_seconds", "Time spent working in a validator step."
+        )
+        self.idle_seconds = REGISTRY.histogram(
+            "validator_step_idle_seconds", "Time a validator step waited for its next turn."
+        )
+        self.loop_lag = REGISTRY.histogram(
+            "validator_loop_lag_seconds", "How much longer than asked the idle sleep took."
+        )
+        self.utilization_gauge = REGISTRY.gauge(
+            "validator_loop_utilization", "Share of recent wall time validator steps spent working."
+        )
+
+    @asynccontextmanager
+    async def step(self):
+        """
+        Times the body as one step, then awaits the rest of the interval.
+        """
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            busy = time.monotonic() - start
+            self.steps += 1
+            self.step_seconds.observe(busy)
+            self._busy.append(busy)
+
+        idle = max(0.0, self.interval - busy)
+        slept = 0.0
+        if idle > 0:
+            sleep_start = time.monotonic()
+            await asyncio.sleep(idle)
+            slept = time.monotonic() - sleep_start
+            self.loop_lag.observe(max(0.0, slept - idle))
+        self.idle_seconds.observe(slept)
+        self._idle.append(slept)
+        self.utilization_gauge.set(self.utilization())
+        bt.logging.debug(
+            f"Step {self.steps} took {busy:.2f}s, idle {slept:.2f}s, utilization {self.utilization():.0%}"
+        )
+
+    def utilization(self) -> float:
+        """
+        Returns the share of the recent steps' wall time spent working, between 0 and 1.
+        """
+        total = sum(self._busy) + sum(self._idle)
+        return sum(self._busy) / total if total > 0 else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "steps": self.steps,
+            "last_step": round(self._busy[-1], 3) if self._busy else 0.0,
+            "last_idle": round(self._idle[-1], 3) if self._idle else 0.0,
+            "utilization": round(self.utilization(), 3),
+        }
@@ -1,15 +1,11 @@
 import asyncio
-import aiohttp
 from sybil.protocol import Challenge
-from typing import List
+from sybil.utils.http import validator_server_client
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 import bittensor as bt
 
+CHALLENGE_NEW_PATH = "/protocol/challenge/new"
 
-# Fetch a challenge from a given URL
-async def fetch(url):
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            return await response.json()
 
 # Wait until the / endpoint returns a 200 OK response
 async def wait_for_validator_container(validator_server_url: str):
@@ -22,42 +18,101 @@ async def wait_for_validator_container(validator_server_url: str):
             return
 
         try:
-            timeout = aiohttp.ClientTimeout(total=10)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(validator_server_url) as response:
-                    if response.status == 200:
-                        bt.logging.info("Validator server is up and running.")
-                        return
+            if await validator_server_client(validator_server_url).get_status("/") == 200:
+                bt.logging.info("Validator server is up and running.")
+                return
         except Exception as e:
             bt.logging.error(f"Validator server not ready yet: {e}")
         retries += 1
         await asyncio.sleep(10)  # Wait before retrying
 
 
-# Generate one challenge per miner_uid, appending ?miner_uid=<uid> to each request
-async def generate_challenges(miner_uids: List[int], validator_server_url: str) -> List[Challenge]:
+def parse_challenge(entry) -> Optional[Challenge]:
+    """
+    Turns a challenge returned by the validator server into a synapse, None if the entry is not a challenge.
+    """
+    if not isinstance(entry, dict) or "challenge" not in entry or "challenge_url" not in entry:
+        return None
+    return Challenge(challenge=entry["challenge"], challenge_url=entry["challenge_url"])
+
+
+async def iter_challenges(
+    miner_uids: List[int],
+    validator_server_url: str,
+    batch_size: int = 256,
+    max_concurrency: int = 8,
+) -> AsyncIterator[Tuple[int, Optional[Challenge]]]:
+    """
+    Generates one challenge per miner uid, yielding `(uid, challenge)` as soon as each one is ready.
+
+    The uids are requested `batch_size` at a time from the batch endpoint, with at most `max_concurrency` requests in
+    flight over the shared connection pool. If a batch request fails, e.g. against a server without the batch
+    endpoint, its uids fall back to one request each. A uid whose challenge could not be generated is yielded with
+    None instead of failing the others.
+
+    Args:
+        miner_uids (List[int]): The uids to generate challenges for.
+        validator_server_url (str): The url of the validator server.
+        batch_size (int): Number of uids per batch request.
+        max_concurrency (int): Maximum number of requests in flight.
+    """
+    client = validator_server_client(validator_server_url)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def single(uid: int) -> Tuple[int, Optional[Challenge]]:
+        try:
+            async with semaphore:
+                response = await client.get_json(f"{CHALLENGE_NEW_PATH}?miner_uid={uid}")
+        except Exception as e:
+            bt.logging.error(f"Failed to generate challenge for miner uid {uid}: {e}")
+            return uid, None
+        return uid, parse_challenge(response)
+
+    async def batch(uids: List[int]) -> List[Tuple[int, Optional[Challenge]]]:
+        try:
+            async with semaphore:
+                response = await client.post_json(CHALLENGE_NEW_PATH, {"miner_uids": uids})
+            challenges = response["challenges"]
+        except Exception as e:
+            bt.logging.warning(
+                f"Batch challenge request for {len(uids)} uids failed, requesting them one by one: {e}"
+            )
+            return await asyncio.gather(*[single(uid) for uid in uids])
+        return [(uid, parse_challenge(challenges.get(str(uid)))) for uid in uids]
+
+    # Before fetching challenges, ensure the validator server is ready
+    await wait_for_validator_container(validator_server_url)
+
+    uids = [int(uid) for uid in miner_uids]
+    tasks = [
+        asyncio.ensure_future(batch(uids[i : i + batch_size]))
+        for i in range(0, len(uids), batch_size)
+    ]
     try:
-        tasks = []
-        for uid in miner_uids:
-            bt.logging.info(f"Generating challenge for miner uid: {uid}")
-            url = f"{validator_server_url}/challenge/new?miner_uid={uid}"
-            tasks.append(fetch(url))
-        
-        # Before fetching challenges, ensure the validator server is ready
-        await wait_for_validator_container(validator_server_url)
-
-        # Gather all the tasks to fetch challenges concurrently
-        responses = await asyncio.gather(*tasks)
-        
-        challenges = [
-            Challenge(
-                challenge=response["challenge"],
-                challenge_url=response["challenge_url"]
-            ) for response in responses
-        ]
-        
-        return challenges
-    except Exception as e:
-        print(f"Error generating challenges: {e}. Returning empty list.")
-        return []
+        for task in asyncio.as_completed(tasks):
+            for result in await task:
+                yield result
+    finally:
+        # The consumer may stop early, do not leave requests running behind it.
+        for task in tasks:
+            task.cancel()
+
+
+async def generate_challenges(
+    miner_uids: List[int], validator_server_url: str, **kwargs
+) -> Dict[int, Challenge]:
+    """
+    Generates one challenge per miner uid, see `iter_challenges`.
 
+    Returns:
+        Dict[int, Challenge]: The challenges that could be generated, by uid.
+    """
+    challenges = {}
+    async for uid, challenge in iter_challenges(miner_uids, validator_server_url, **kwargs):
+        if challenge is not None:
+            challenges[uid] = challenge
+    if len(challenges) < len(miner_uids):
+        bt.logging.warning(
+            f"Generated challenges for {len(challenges)} of {len(miner_uids)} miners"
+        )
+    return challenges
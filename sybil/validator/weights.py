@@ -0,0 +1,331 @@
+import time
+import random
+import threading
+import numpy as np
+import bittensor as bt
+
+from typing import Callable, List, Optional, Tuple
+
+from sybil.utils.metrics import REGISTRY
+from sybil.base.utils.weight_utils import U16_MAX
+
+
+def weight_change(
+    previous: "WeightVector", uids: List[int], weights: List[int]
+) -> Tuple[float, float]:
+    """
+    Returns how far two quantized weight vectors are apart, in fractions of the largest weight.
+
+    Args:
+        previous (WeightVector): The vector last set on chain.
+        uids (List[int]): The uids of the new vector.
+        weights (List[int]): The uint16 weights of the new vector.
+
+    Returns:
+        Tuple[float, float]: The L1 and L-infinity distance, uids missing from one vector counting as weight 0.
+    """
+    size = max(max(previous.uids, default=-1), max(uids, default=-1)) + 1
+    before = np.zeros(size, dtype=np.int64)
+    after = np.zeros(size, dtype=np.int64)
+    before[previous.uids] = previous.weights
+    after[uids] = weights
+    diff = np.abs(after - before)
+    if diff.size == 0:
+        return 0.0, 0.0
+    return float(diff.sum()) / U16_MAX, float(diff.max()) / U16_MAX
+
+
+class WeightVector:
+    """
+    One weight vector handed to the submitter, with the book-keeping of its submission.
+    """
+
+    def __init__(self, uids: List[int], weights: List[int], version: int):
+        self.uids = uids
+        self.weights = weights
+        self.version = version
+        self.attempts = 0
+        self.created = time.monotonic()
+        # Block the extrinsic was accepted at, once it was.
+        self.submitted_block: Optional[int] = None
+
+
+class WeightSubmitter:
+    """
+    Submits weights to the chain from a background thread, so a slow or failing submission never stalls forwards.
+
+    `submit` hands over a quantized weight vector and returns straight away. The worker sends it with
+    `subtensor.set_weights`, retrying failed attempts with full jitter exponential backoff up to `max_attempts`
+    times. A vector submitted while another is still pending or backing off replaces it, only the latest weights
+    are worth sending. Once an extrinsic is accepted, the worker watches the validator's last update on chain while
+    idle, and counts the vector as included once it moved past the submission block, or as not included after
+    `inclusion_blocks` blocks.
+
+    A vector within `l1_threshold` and `linf_threshold` of the last one accepted on chain, see `weight_change`, is
+    skipped rather than submitted, unless `refresh_blocks` blocks passed since, so weights are refreshed before they
+    go stale on chain. Nothing is skipped while another vector is pending or being submitted, as that one may still
+    replace the last accepted vector on chain.
+
+    The worker uses its own chain connection, made by `subtensor_factory` in the worker thread, as a connection must
+    not be shared between threads. Attempts, their latency and the outcome of every vector are recorded in the
+    metrics registry and in `stats()`.
+
+    Args:
+        subtensor_factory (Callable[[], bt.subtensor]): Makes the chain connection the worker submits through.
+        wallet (bt.wallet): The validator's wallet.
+        netuid (int): The subnet weights are set on.
+        uid (int): The validator's uid, whose last update tells whether weights were included.
+        version_key (int): The version key weights are set with.
+        max_attempts (int): Attempts per vector before giving up on it.
+        backoff (float): Base delay in seconds of the first retry, doubled for every further one.
+        max_backoff (float): Upper bound of a single retry delay.
+        inclusion_blocks (int): Blocks to wait for an accepted extrinsic to show up on chain.
+        inclusion_poll (float): Seconds between two inclusion checks.
+        l1_threshold (float): L1 change, in fractions of the largest weight, up to which a vector is skipped.
+        linf_threshold (float): Largest change of a single weight up to which a vector is skipped.
+        refresh_blocks (int): Blocks after which a vector is submitted even if it barely changed.
+    """
+
+    def __init__(
+        self,
+        subtensor_factory: Callable[[], "bt.subtensor"],
+        wallet: "bt.wallet",
+        netuid: int,
+        uid: int,
+        version_key: int,
+        max_attempts: int = 5,
+        backoff: float = 2.0,
+        max_backoff: float = 60.0,
+        inclusion_blocks: int = 10,
+        inclusion_poll: float = 12.0,
+        l1_threshold: float = 0.0,
+        linf_threshold: float = 0.0,
+        refresh_blocks: int = 2000,
+    ):
+        self.subtensor_factory = subtensor_factory
+        self.wallet = wallet
+        self.netuid = netuid
+        self.uid = uid
+        self.version_key = version_key
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.inclusion_blocks = inclusion_blocks
+        self.inclusion_poll = inclusion_poll
+        self.l1_threshold = l1_threshold
+        self.linf_threshold = linf_threshold
+        self.refresh_blocks = refresh_blocks
+        # Last vector the chain accepted, what new vectors are compared to.
+        self.last_accepted: Optional[WeightVector] = None
+        self.subtensor: Optional["bt.subtensor"] = None
+        self.pending: Optional[WeightVector] = None
+        # Vector the worker took over, from its first attempt until it was accepted or given up on.
+        self.inflight: Optional[WeightVector] = None
+        self.awaiting: Optional[WeightVector] = None
+        self.last_included: Optional[WeightVector] = None
+        self.outcomes = {
+            "success": 0,
+            "failed": 0,
+            "superseded": 0,
+            "skipped": 0,
+            "included": 0,
+            "not_included": 0,
+        }
+        self._versions = 0
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+        self._wakeup = threading.Condition()
+        self.latency = REGISTRY.histogram(
+            "weight_submission_seconds", "Duration of a single set_weights attempt."
+        )
+        self.attempt_counter = REGISTRY.counter(
+            "weight_submission_attempts_total", "set_weights attempts made."
+        )
+        self.inclusion_delay = REGISTRY.histogram(
+            "weight_inclusion_seconds", "Time from handing weights over to seeing them included on chain."
+        )
+        self._outcome_counters = {
+            outcome: REGISTRY.counter(
+                "weight_submissions_total", "Weight vectors by outcome.", {"outcome": outcome}
+            )
+            for outcome in self.outcomes
+        }
+
+    def submit(self, uids: List[int], weights: List[int], block: int) -> bool:
+        """
+        Queues a weight vector for submission, replacing any vector not submitted yet, unless it is too close to
+        the last one set on chain.
+
+        Args:
+            uids (List[int]): The uids weights are set for.
+            weights (List[int]): The uint16 weight of every uid.
+            block (int): The current block.
+
+        Returns:
+            bool: True if the vector was queued, False if it was skipped.
+        """
+        with self._wakeup:
+            last = self.last_accepted
+            # A vector still being submitted may replace the last accepted one on chain, only skip when none is.
+            idle = self.pending is None and self.inflight is None
+            if idle and last is not None and block - last.submitted_block < self.refresh_blocks:
+                l1, linf = weight_change(last, uids, weights)
+                if l1 <= self.l1_threshold and linf <= self.linf_threshold:
+                    self._count("skipped")
+                    bt.logging.info(
+                        f"Skipping set_weights, weights moved by L1 {l1:.5f} and L-inf {linf:.5f} since block "
+                        f"{last.submitted_block}"
+                    )
+                    return False
+
+            self._versions += 1
+            if self.pending is not None:
+                bt.logging.info(f"Weights {self.pending.version} superseded by newer weights before submission")
+                self._count("superseded")
+            self.pending = WeightVector(uids, weights, self._versions)
+            self._wakeup.notify()
+            if self._thread is None or not self._thread.is_alive():
+                self._stop = False
+                self._thread = threading.Thread(target=self._run, name="weight-submitter", daemon=True)
+                self._thread.start()
+        return True
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Stops the worker, abandoning any pending vector.
+        """
+        with self._wakeup:
+            self._stop = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _count(self, outcome: str):
+        self.outcomes[outcome] += 1
+        self._outcome_counters[outcome].inc()
+
+    def _wait(self, timeout: Optional[float]) -> Optional[WeightVector]:
+        # Waits for a vector to submit, returning None on timeout or when stopping.
+        with self._wakeup:
+            if self.pending is None and not self._stop:
+                self._wakeup.wait(timeout)
+            if self._stop:
+                return None
+            vector, self.pending = self.pending, None
+            if vector is not None:
+                self.inflight = vector
+            return vector
+
+    def _run(self):
+        try:
+            self.subtensor = self.subtensor_factory()
+        except Exception as e:
+            bt.logging.error(f"Weight submitter failed to connect to the chain: {e}")
+            with self._wakeup:
+                self._thread = None
+                vector, self.pending = self.pending, None
+            # Nothing can submit the vector, the next one starts the worker again.
+            if vector is not None:
+                bt.logging.error(f"Dropping weights {vector.version}, no chain connection to submit them")
+                self._count("failed")
+            return
+
+        vector: Optional[WeightVector] = None
+        while not self._stop:
+            if vector is None:
+                vector = self._wait(self.inclusion_poll if self.awaiting is not None else None)
+                if vector is None:
+                    self._check_inclusion()
+                    continue
+
+            if self._attempt(vector):
+                self._done()
+                vector = None
+                continue
+            if vector.attempts >= self.max_attempts:
+                bt.logging.error(f"Giving up on weights {vector.version} after {vector.attempts} attempts")
+                self._count("failed")
+                self._done()
+                vector = None
+                continue
+
+            # Back off, unless newer weights come in meanwhile, which are then submitted instead.
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (vector.attempts - 1)))
+            newer = self._wait(delay)
+            if newer is not None:
+                bt.logging.info(f"Weights {vector.version} superseded by newer weights while backing off")
+                self._count("superseded")
+                vector = newer
+
+    def _done(self):
+        # The vector in flight was accepted or given up on.
+        with self._wakeup:
+            self.inflight = None
+
+    def _attempt(self, vector: WeightVector) -> bool:
+        vector.attempts += 1
+        self.attempt_counter.inc()
+        start = time.perf_counter()
+        try:
+            result, msg = self.subtensor.set_weights(
+                wallet=self.wallet,
+                netuid=self.netuid,
+                uids=vector.uids,
+                weights=vector.weights,
+                wait_for_finalization=False,
+                wait_for_inclusion=False,
+                version_key=self.version_key,
+            )
+        except Exception as e:
+            result, msg = False, str(e)
+        finally:
+            self.latency.observe(time.perf_counter() - start)
+
+        if result is not True:
+            bt.logging.error(f"set_weights failed (attempt {vector.attempts}/{self.max_attempts}): {msg}")
+            return False
+
+        bt.logging.info("set_weights on chain successfully!")
+        self._count("success")
+        try:
+            vector.submitted_block = int(self.subtensor.get_current_block())
+            self.awaiting = vector
+            self.last_accepted = vector
+        except Exception as e:
+            bt.logging.debug(f"Not tracking inclusion of weights {vector.version}: {e}")
+        return True
+
+    def _check_inclusion(self):
+        vector = self.awaiting
+        if vector is None:
+            return
+        try:
+            block = int(self.subtensor.get_current_block())
+            since = self.subtensor.blocks_since_last_update(netuid=self.netuid, uid=self.uid)
+        except Exception as e:
+            bt.logging.debug(f"Failed to check inclusion of weights {vector.version}: {e}")
+            return
+
+        if since is not None and block - since >= vector.submitted_block:
+            self._count("included")
+            self.inclusion_delay.observe(time.monotonic() - vector.created)
+            self.last_included = vector
+            self.awaiting = None
+            bt.logging.info(f"Weights {vector.version} included on chain at block {block - since}")
+        elif block - vector.submitted_block > self.inclusion_blocks:
+            self._count("not_included")
+            self.awaiting = None
+            # The chain does not hold these weights, the next vector must not be compared to them.
+            if self.last_accepted is vector:
+                self.last_accepted = None
+            bt.logging.warning(
+                f"Weights {vector.version} not included {block - vector.submitted_block} blocks after submission"
+            )
+
+    def stats(self) -> dict:
+        return {
+            **self.outcomes,
+            "pending": self.pending is not None,
+            "in_flight": self.inflight is not None,
+            "awaiting_inclusion": self.awaiting is not None,
+        }
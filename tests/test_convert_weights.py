@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from sybil.base.utils.weight_utils import U16_MAX, convert_weights_and_uids_for_emit
+
+
+def legacy_convert(uids: np.ndarray, weights: np.ndarray):
+    """convert_weights_and_uids_for_emit as it was before being vectorized, minus the logging."""
+    uids = np.asarray(uids)
+    weights = np.asarray(weights)
+    if np.min(weights) < 0:
+        raise ValueError("negative weight")
+    if np.min(uids) < 0:
+        raise ValueError("negative uid")
+    if len(uids) != len(weights):
+        raise ValueError("length mismatch")
+    if np.sum(weights) == 0:
+        return [], []
+    max_weight = float(np.max(weights))
+    weights = [float(value) / max_weight for value in weights]
+    weight_vals = []
+    weight_uids = []
+    for weight_i, uid_i in list(zip(weights, uids)):
+        uint16_val = round(float(weight_i) * int(U16_MAX))
+        if uint16_val != 0:
+            weight_vals.append(uint16_val)
+            weight_uids.append(uid_i)
+    return weight_uids, weight_vals
+
+
+EDGE_CASES = {
+    "all zeros": (np.arange(8), np.zeros(8)),
+    "single": (np.array([3]), np.array([0.2])),
+    "ties": (np.arange(6), np.full(6, 0.5, dtype=np.float32)),
+    "tiny values round to zero": (np.arange(5), np.array([1.0, 1e-9, 7e-6, 8e-6, 0.0])),
+    "half way": (np.arange(4), np.array([1.0, 0.5 / U16_MAX, 1.5 / U16_MAX, 2.5 / U16_MAX])),
+    "unsorted uids": (np.array([9, 2, 7, 0]), np.array([0.1, 0.4, 0.0, 0.5])),
+    "integer weights": (np.arange(4), np.array([0, 3, 1, 65535])),
+    "denormals": (np.arange(3), np.array([5e-324, 1e-320, 1e-310])),
+}
+
+
+def random_cases(rng: np.random.Generator, count: int):
+    for _ in range(count):
+        size = int(rng.integers(1, 1024))
+        dtype = rng.choice([np.float32, np.float64])
+        kind = rng.integers(4)
+        if kind == 0:
+            weights = rng.random(size)
+        elif kind == 1:
+            weights = rng.random(size) * (rng.random(size) < 0.05)
+        elif kind == 2:
+            weights = rng.pareto(0.5, size)
+        else:
+            weights = rng.integers(0, U16_MAX, size) / U16_MAX
+        uids = rng.permutation(size * 2)[:size]
+        yield uids, weights.astype(dtype)
+
+
+def assert_same(uids: np.ndarray, weights: np.ndarray):
+    expected = legacy_convert(uids, weights)
+    actual = convert_weights_and_uids_for_emit(uids, weights)
+    assert list(map(int, expected[0])) == actual[0]
+    assert expected[1] == actual[1]
+    assert all(type(value) is int for value in actual[0] + actual[1])
+
+
+@pytest.mark.parametrize("name", EDGE_CASES)
+def test_edge_cases(name):
+    assert_same(*EDGE_CASES[name])
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_matches_legacy(seed):
+    for uids, weights in random_cases(np.random.default_rng(seed), 500):
+        assert_same(uids, weights)
+
+
+@pytest.mark.parametrize(
+    "uids, weights",
+    [
+        (np.arange(2), np.array([0.5, -0.1])),
+        (np.array([-1, 1]), np.array([0.5, 0.5])),
+        (np.arange(2), np.array([0.5, np.nan])),
+    ],
+    ids=["negative weight", "negative uid", "nan weight"],
+)
+def test_rejects_invalid(uids, weights):
+    with pytest.raises(ValueError):
+        convert_weights_and_uids_for_emit(uids, weights)
@@ -0,0 +1,92 @@
+import asyncio
+
+from aiohttp import web
+
+from sybil.utils.http import CircuitBreaker, PooledClient, validator_server_client
+from sybil.validator.reward import VERIFY_ENDPOINT, verify_response
+
+
+async def serve():
+    async def slow(request):
+        await asyncio.sleep(10)
+        return web.json_response({})
+
+    async def ok(request):
+        return web.json_response({"ok": True})
+
+    async def verify(request):
+        return web.json_response({"score": 1.0})
+
+    app = web.Application()
+    app.router.add_get("/slow", slow)
+    app.router.add_get("/ok", ok)
+    app.router.add_get("/protocol/challenge/{challenge}/{response}", verify)
+    runner = web.AppRunner(app, shutdown_timeout=0.1)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}"
+
+
+async def cancel(coroutine):
+    task = asyncio.ensure_future(coroutine)
+    await asyncio.sleep(0.05)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def test_cancelled_requests_do_not_open_the_circuit():
+    async def run():
+        runner, url = await serve()
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60.0)
+        client = PooledClient(url, retries=0, breaker=breaker)
+        try:
+            for _ in range(5):
+                await cancel(client.get_json("/slow"))
+            assert not breaker.is_open
+            assert breaker.failures == 0
+            assert await client.get_json("/ok") == {"ok": True}
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    asyncio.run(run())
+
+
+def test_cancelled_probe_lets_another_probe_through():
+    async def run():
+        runner, url = await serve()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        client = PooledClient(url, retries=0, breaker=breaker)
+        try:
+            breaker.record_failure()
+            opened_at = breaker.opened_at
+            await asyncio.sleep(0.02)
+            await cancel(client.get_json("/slow"))
+            # The cancelled probe neither counted as a failure nor restarted the reset timeout.
+            assert breaker.opened_at == opened_at
+            assert await client.get_json("/ok") == {"ok": True}
+            assert not breaker.is_open
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    asyncio.run(run())
+
+
+def test_verifications_share_one_metrics_series():
+    async def run():
+        runner, url = await serve()
+        try:
+            # Responses are chosen by miners and must not each add a series.
+            for response in ["abc", "not-hex-at-all", "x" * 40, "0123"]:
+                assert await verify_response("c0ffee", response, url) == 1.0
+            assert list(validator_server_client(url)._metrics) == [VERIFY_ENDPOINT]
+        finally:
+            await validator_server_client(url).close()
+            await runner.cleanup()
+
+    asyncio.run(run())
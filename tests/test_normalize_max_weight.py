@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from sybil.base.utils.weight_utils import normalize_max_weight
+
+# Relative tolerance the vectorized implementation is documented to match the former one within.
+RTOL = 1e-6
+
+
+def legacy_normalize_max_weight(x: np.ndarray, limit: float = 0.1) -> np.ndarray:
+    """normalize_max_weight as it was before being vectorized."""
+    epsilon = 1e-7
+    weights = x.copy()
+    values = np.sort(weights)
+    if x.sum() == 0 or len(x) * limit <= 1:
+        return np.ones_like(x) / x.size
+    estimation = values / values.sum()
+    if estimation.max() <= limit:
+        return weights / weights.sum()
+    cumsum = np.cumsum(estimation, 0)
+    estimation_sum = np.array(
+        [(len(values) - i - 1) * estimation[i] for i in range(len(values))]
+    )
+    n_values = (estimation / (estimation_sum + cumsum + epsilon) < limit).sum()
+    cutoff_scale = (limit * cumsum[n_values - 1] - epsilon) / (
+        1 - (limit * (len(estimation) - n_values))
+    )
+    cutoff = cutoff_scale * values.sum()
+    weights[weights > cutoff] = cutoff
+    return weights / weights.sum()
+
+
+def random_vectors(rng: np.random.Generator, count: int):
+    """Random vectors covering the shapes weights take: sparse, skewed, tied, tiny, all zero."""
+    for _ in range(count):
+        size = int(rng.integers(1, 512))
+        dtype = rng.choice([np.float32, np.float64])
+        kind = rng.integers(6)
+        if kind == 0:
+            x = rng.random(size)
+        elif kind == 1:
+            x = rng.random(size) * (rng.random(size) < 0.1)
+        elif kind == 2:
+            x = rng.pareto(1.0, size)
+        elif kind == 3:
+            x = np.full(size, rng.random())
+        elif kind == 4:
+            x = rng.random(size) * 1e-30
+        else:
+            x = np.zeros(size)
+        yield x.astype(dtype), float(rng.choice([0.01, 0.05, 0.1, 0.5, 1.0]))
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_matches_legacy(seed):
+    for x, limit in random_vectors(np.random.default_rng(seed), 500):
+        expected = legacy_normalize_max_weight(x, limit)
+        actual = normalize_max_weight(x, limit)
+        assert actual.dtype == expected.dtype
+        np.testing.assert_allclose(actual, expected, rtol=RTOL, atol=0, err_msg=f"limit={limit}")
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_batch_rows_match_vectors(seed):
+    for x, limit in random_vectors(np.random.default_rng(seed), 100):
+        batch = np.stack([x, x[::-1], np.zeros_like(x)])
+        for row, vector in zip(normalize_max_weight(batch, limit), batch):
+            np.testing.assert_allclose(row, legacy_normalize_max_weight(vector, limit), rtol=RTOL, atol=0)
+
+
+@pytest.mark.parametrize(
+    "x, limit",
+    [
+        (np.zeros(8), 0.1),
+        (np.ones(4), 0.1),
+        (np.array([1.0, 0.0, 0.0, 0.0]), 0.5),
+        (np.array([5.0, 1.0, 1.0, 1.0, 1.0, 1.0]), 0.25),
+        (np.array([1e-30, 2e-30, 3e-30]), 0.5),
+    ],
+)
+def test_edge_cases(x, limit):
+    np.testing.assert_allclose(normalize_max_weight(x, limit), legacy_normalize_max_weight(x, limit), rtol=RTOL, atol=0)
@@ -0,0 +1,184 @@
+import time
+import threading
+
+import pytest
+
+from sybil.validator import weights as weights_module
+from sybil.validator.weights import WeightSubmitter
+
+
+class FakeSubtensor:
+    """
+    Chain the submitter talks to: `set_weights` answers from `results`, one per call, succeeding once they run out,
+    and a successful call is included on chain when `include` is set.
+    """
+
+    def __init__(self, results=(), include=True):
+        self.results = list(results)
+        self.include = include
+        self.block = 100
+        self.last_update = 0
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def set_weights(self, wallet, netuid, uids, weights, wait_for_finalization, wait_for_inclusion, version_key):
+        with self._lock:
+            self.calls.append((list(uids), list(weights)))
+            result = self.results.pop(0) if self.results else True
+        if isinstance(result, Exception):
+            raise result
+        if result and self.include:
+            self.last_update = self.block
+        return result, "" if result else "rejected"
+
+    def get_current_block(self):
+        return self.block
+
+    def blocks_since_last_update(self, netuid, uid):
+        return self.block - self.last_update
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def make_submitter():
+    submitters = []
+
+    def make(subtensor, **kwargs):
+        kwargs = {"backoff": 0.001, "max_backoff": 0.001, "inclusion_poll": 0.01, **kwargs}
+        submitter = WeightSubmitter(lambda: subtensor, None, 1, 0, 1, **kwargs)
+        submitters.append(submitter)
+        return submitter
+
+    yield make
+    for submitter in submitters:
+        submitter.stop()
+
+
+def test_retries_until_success(make_submitter):
+    subtensor = FakeSubtensor(results=[False, RuntimeError("connection reset"), False])
+    submitter = make_submitter(subtensor)
+
+    assert submitter.submit([1, 2], [100, 200], block=100)
+    wait_for(lambda: submitter.outcomes["success"] == 1)
+    assert len(subtensor.calls) == 4
+    assert submitter.outcomes["failed"] == 0
+    assert submitter.last_accepted.weights == [100, 200]
+
+
+def test_newer_vector_supersedes_one_backing_off(make_submitter, monkeypatch):
+    # Back off for the longest delay, so the newer vector surely comes in meanwhile.
+    monkeypatch.setattr(weights_module.random, "uniform", lambda low, high: high)
+    subtensor = FakeSubtensor(results=[False])
+    submitter = make_submitter(subtensor, backoff=30.0, max_backoff=30.0)
+
+    submitter.submit([1], [100], block=100)
+    wait_for(lambda: len(subtensor.calls) == 1)
+    submitter.submit([2], [200], block=100)
+    wait_for(lambda: submitter.outcomes["success"] == 1)
+    assert submitter.outcomes["superseded"] == 1
+    assert subtensor.calls == [([1], [100]), ([2], [200])]
+
+
+def test_gives_up_after_max_attempts(make_submitter):
+    subtensor = FakeSubtensor(results=[False] * 10)
+    submitter = make_submitter(subtensor, max_attempts=3)
+
+    submitter.submit([1], [100], block=100)
+    wait_for(lambda: submitter.outcomes["failed"] == 1)
+    assert len(subtensor.calls) == 3
+    assert submitter.outcomes["success"] == 0
+    assert submitter.last_accepted is None
+
+
+def test_failed_connection_drops_the_pending_vector(make_submitter):
+    def unreachable():
+        raise ConnectionError("unreachable")
+
+    submitter = make_submitter(None)
+    submitter.subtensor_factory = unreachable
+
+    submitter.submit([1], [100], block=100)
+    wait_for(lambda: submitter.outcomes["failed"] == 1)
+    assert submitter.pending is None
+
+    # The next vector starts a new worker.
+    subtensor = FakeSubtensor()
+    submitter.subtensor_factory = lambda: subtensor
+    submitter.submit([2], [200], block=100)
+    wait_for(lambda: submitter.outcomes["success"] == 1)
+
+
+def test_identical_vector_is_skipped_and_changed_one_submitted(make_submitter):
+    subtensor = FakeSubtensor()
+    submitter = make_submitter(subtensor, l1_threshold=0.01, linf_threshold=0.01)
+
+    assert submitter.submit([1, 2], [65535, 30000], block=100)
+    wait_for(lambda: submitter.outcomes["included"] == 1)
+
+    assert not submitter.submit([1, 2], [65535, 30000], block=101)
+    assert submitter.outcomes["skipped"] == 1
+
+    assert submitter.submit([1, 2], [65535, 10000], block=102)
+    wait_for(lambda: submitter.outcomes["success"] == 2)
+    assert len(subtensor.calls) == 2
+
+
+def test_unchanged_vector_is_resubmitted_after_refresh_blocks(make_submitter):
+    subtensor = FakeSubtensor()
+    submitter = make_submitter(subtensor, l1_threshold=0.01, linf_threshold=0.01, refresh_blocks=50)
+
+    submitter.submit([1], [65535], block=100)
+    wait_for(lambda: submitter.outcomes["included"] == 1)
+
+    assert not submitter.submit([1], [65535], block=149)
+    subtensor.block = 150
+    assert submitter.submit([1], [65535], block=150)
+    wait_for(lambda: submitter.outcomes["success"] == 2)
+
+
+def test_not_included_vector_is_not_compared_to(make_submitter):
+    subtensor = FakeSubtensor(include=False)
+    submitter = make_submitter(subtensor, l1_threshold=0.01, linf_threshold=0.01, inclusion_blocks=2)
+
+    submitter.submit([1], [65535], block=100)
+    wait_for(lambda: submitter.outcomes["success"] == 1)
+    assert submitter.last_accepted is not None
+
+    subtensor.block = 103
+    wait_for(lambda: submitter.outcomes["not_included"] == 1)
+    assert submitter.last_accepted is None
+
+    # The chain does not hold the vector, so the same one is submitted again.
+    assert submitter.submit([1], [65535], block=103)
+    wait_for(lambda: submitter.outcomes["success"] == 2)
+    assert submitter.outcomes["skipped"] == 0
+
+
+def test_vector_arriving_while_another_backs_off_is_not_skipped(make_submitter, monkeypatch):
+    monkeypatch.setattr(weights_module.random, "uniform", lambda low, high: high)
+    subtensor = FakeSubtensor()
+    submitter = make_submitter(
+        subtensor, backoff=30.0, max_backoff=30.0, l1_threshold=0.01, linf_threshold=0.01
+    )
+
+    submitter.submit([1], [65535], block=100)
+    wait_for(lambda: submitter.outcomes["included"] == 1)
+
+    # A different vector fails once and backs off.
+    subtensor.results = [False]
+    submitter.submit([2], [65535], block=101)
+    wait_for(lambda: len(subtensor.calls) == 2)
+
+    # The chain still holds the first vector, but the one backing off would replace it, so the first is queued.
+    assert submitter.submit([1], [65535], block=102)
+    wait_for(lambda: submitter.outcomes["success"] == 2)
+    assert submitter.outcomes["skipped"] == 0
+    assert submitter.outcomes["superseded"] == 1
+    assert subtensor.calls[-1] == ([1], [65535])